@@ -1,28 +1,99 @@
 from flask import Flask
 from flask_cors import CORS
-from database import db, init_db
+from database import db, init_db, engine_options, read_bind, configure_engines, READ_BIND_KEY
 from routes import api_bp
+from scrape_queue import ScrapeQueue
+from driver_pool import DriverPool
+from response_cache import ResponseCache
+from instrumentation import RequestInstrumentation
+from scheduler import ScrapeScheduler
+from commands import register_commands
 import os
 
+# Response headers the frontend may read across origins
+CORS_EXPOSE_HEADERS = ['X-Next-Cursor', 'Link', 'Location', 'ETag']
+
 def create_app():
     app = Flask(__name__)
     
-    CORS(app)
+    CORS(app, expose_headers=CORS_EXPOSE_HEADERS)
     
     basedir = os.path.abspath(os.path.dirname(__file__))
-    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.join(basedir, "jobs.db")}'
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get(
+        'SQLALCHEMY_DATABASE_URI', f'sqlite:///{os.path.join(basedir, "jobs.db")}')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 10))
+    app.config['DB_MAX_OVERFLOW'] = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    app.config['DB_POOL_TIMEOUT'] = float(os.environ.get('DB_POOL_TIMEOUT', 30))
+    app.config['DB_POOL_RECYCLE'] = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    read_engine = read_bind(app.config, os.environ.get('SQLALCHEMY_READ_DATABASE_URI'))
+    if read_engine:
+        app.config['SQLALCHEMY_BINDS'] = {READ_BIND_KEY: read_engine}
+    app.config['SQLITE_PRAGMAS'] = {
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),
+        'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -64000)),
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    }
+    app.config['STATS_CACHE_TTL'] = float(os.environ.get('STATS_CACHE_TTL', 5.0))
+    app.config['RESPONSE_CACHE_MAX_ENTRIES'] = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 512))
+    app.config['RESPONSE_CACHE_MAX_BYTES'] = int(os.environ.get('RESPONSE_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    app.config['RESPONSE_CACHE_TTL'] = float(os.environ.get('RESPONSE_CACHE_TTL', 60))
+    app.config['RESPONSE_CACHE_VERSION_TTL'] = float(os.environ.get('RESPONSE_CACHE_VERSION_TTL', 1.0))
+    app.config['JSON_ENCODER'] = os.environ.get('JSON_ENCODER', 'auto')
+    app.config['COMPRESS_ALGORITHMS'] = tuple(
+        a.strip() for a in os.environ.get('COMPRESS_ALGORITHMS', 'br,gzip').split(',') if a.strip())
+    app.config['COMPRESS_MIN_SIZE'] = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+    app.config['PROFILING_ENABLED'] = os.environ.get('PROFILING_ENABLED', '').lower() in ('1', 'true', 'yes')
+    app.config['PROFILE_INTERVAL'] = float(os.environ.get('PROFILE_INTERVAL', 0.002))
+    app.config['SQL_STATEMENTS_WARN'] = int(os.environ.get('SQL_STATEMENTS_WARN', 50))
+    app.config['SCRAPE_WORKERS'] = int(os.environ.get('SCRAPE_WORKERS', 2))
+    app.config['SCRAPE_MAX_PAGES'] = int(os.environ.get('SCRAPE_MAX_PAGES', 10))
+    app.config['SCRAPE_MAX_WAIT'] = float(os.environ.get('SCRAPE_MAX_WAIT', 120))
+    app.config['SCRAPE_HOST_INTERVAL'] = float(os.environ.get('SCRAPE_HOST_INTERVAL', 1.0))
+    app.config['SCRAPE_BACKEND'] = os.environ.get('SCRAPE_BACKEND', 'http')
+    app.config['SCRAPE_PACING'] = os.environ.get('SCRAPE_PACING', 'fixed')
+    app.config['SCRAPE_PACE_FLOOR'] = float(os.environ.get('SCRAPE_PACE_FLOOR', 0.1))
+    app.config['SCRAPE_PACE_CEILING'] = float(os.environ.get('SCRAPE_PACE_CEILING', 10.0))
+    app.config['SCRAPE_INCREMENTAL'] = os.environ.get('SCRAPE_INCREMENTAL', '1').lower() in ('1', 'true', 'yes')
+    app.config['SCRAPE_SEEN_ERROR_RATE'] = float(os.environ.get('SCRAPE_SEEN_ERROR_RATE', 0.001))
+    app.config['SCRAPE_SEEN_MAX_AGE'] = int(os.environ.get('SCRAPE_SEEN_MAX_AGE', 3600))
+    app.config['SCRAPE_SEEN_STOP_RATIO'] = float(os.environ.get('SCRAPE_SEEN_STOP_RATIO', 0.8))
+    app.config['NEAR_DUPLICATE_THRESHOLD'] = float(os.environ.get('NEAR_DUPLICATE_THRESHOLD', 0.9))
+    app.config['SCHEDULER_ENABLED'] = os.environ.get('SCHEDULER_ENABLED', '').lower() in ('1', 'true', 'yes')
+    app.config['SCRAPE_SCHEDULE'] = os.environ.get('SCRAPE_SCHEDULE', '')
+    app.config['SCHEDULER_TICK'] = float(os.environ.get('SCHEDULER_TICK', 30))
+    app.config['RETENTION_MAX_AGE_DAYS'] = float(os.environ.get('RETENTION_MAX_AGE_DAYS', 0))
+    app.config['RETENTION_MODE'] = os.environ.get('RETENTION_MODE', 'archive')
+    app.config['RETENTION_SCRAPED_ONLY'] = os.environ.get('RETENTION_SCRAPED_ONLY', '1').lower() in ('1', 'true', 'yes')
+    app.config['RETENTION_INTERVAL'] = float(os.environ.get('RETENTION_INTERVAL', 3600))
+    app.config['RETENTION_BATCH_SIZE'] = int(os.environ.get('RETENTION_BATCH_SIZE', 500))
+    app.config['SCRAPE_ENGINE_WORKERS'] = int(os.environ.get('SCRAPE_ENGINE_WORKERS', 0))
+    app.config['DRIVER_POOL_SIZE'] = int(os.environ.get('DRIVER_POOL_SIZE', app.config['SCRAPE_WORKERS']))
+    app.config['DRIVER_POOL_MAX_USES'] = int(os.environ.get('DRIVER_POOL_MAX_USES', 50))
+    app.config['DRIVER_POOL_PREWARM'] = os.environ.get('DRIVER_POOL_PREWARM', '').lower() in ('1', 'true', 'yes')
     
     db.init_app(app)
+    configure_engines(app)
+    RequestInstrumentation(app)
+    ScrapeQueue(app)
+    DriverPool(app)
+    ResponseCache(app)
+    ScrapeScheduler(app)
     
     app.register_blueprint(api_bp, url_prefix='/api')
+    register_commands(app)
     
     return app
 
 if __name__ == '__main__':
     app = create_app()
     
-    with app.app_context():
-        init_db()
+    init_db(app)
+    # Only in the reloader's serving process, not in its file watcher
+    if app.config['SCHEDULER_ENABLED'] and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        app.extensions['scrape_scheduler'].start()
     
     app.run(debug=True, port=5000)
\ No newline at end of file
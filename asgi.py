@@ -0,0 +1,67 @@
+import os
+import logging
+from contextlib import asynccontextmanager
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.gzip import GZipMiddleware
+from app import create_app, CORS_EXPOSE_HEADERS
+from database import init_db
+from async_database import AsyncDatabase
+from async_routes import routes
+from instrumentation import AsyncRequestInstrumentation
+
+logger = logging.getLogger(__name__)
+
+
+def create_asgi_app(flask_app=None):
+    """Build the ASGI app serving the /api routes with async handlers.
+
+    flask_app (create_app() by default) supplies the configuration and the
+    extensions shared with the WSGI app: the scrape queue and driver pool,
+    whose scrapes run on worker threads, the response cache and the
+    synchronous session used by batch writes. Reads and single-job writes
+    go through an AsyncDatabase on the same database.
+
+    Serve it with an ASGI server, e.g.
+    uvicorn --factory asgi:create_asgi_app --workers 4
+    """
+    flask_app = flask_app or create_app()
+    init_db(flask_app)
+    async_db = AsyncDatabase(flask_app)
+    config = flask_app.config
+
+    middleware = [
+        Middleware(AsyncRequestInstrumentation, sql_statements_warn=config.get('SQL_STATEMENTS_WARN', 50)),
+        Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'],
+                   expose_headers=CORS_EXPOSE_HEADERS),
+    ]
+    if 'gzip' in config.get('COMPRESS_ALGORITHMS', ()):
+        middleware.append(Middleware(GZipMiddleware, minimum_size=config.get('COMPRESS_MIN_SIZE', 1024)))
+
+    @asynccontextmanager
+    async def lifespan(app):
+        await async_db.probe()
+        # One scheduler per process: enable it only with a single worker
+        scheduler = flask_app.extensions['scrape_scheduler']
+        if config.get('SCHEDULER_ENABLED'):
+            scheduler.start()
+        yield
+        scheduler.stop(timeout=5)
+        flask_app.extensions['scrape_queue'].shutdown(wait=False)
+        await async_db.dispose()
+
+    app = Starlette(routes=routes, middleware=middleware, lifespan=lifespan)
+    app.state.flask_app = flask_app
+    app.state.config = config
+    app.state.async_db = async_db
+    return app
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run('asgi:create_asgi_app', factory=True,
+                host=os.environ.get('HOST', '127.0.0.1'),
+                port=int(os.environ.get('PORT', 5000)),
+                workers=int(os.environ.get('ASGI_WORKERS', 1)))
@@ -0,0 +1,98 @@
+import logging
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from database import db, READ_BIND_KEY, SQLITE_PRAGMAS, engine_options, configure_engine
+from instrumentation import RequestInstrumentation
+
+logger = logging.getLogger(__name__)
+
+# Async DBAPI driver used for each database backend
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+    'mysql': 'mysql+aiomysql',
+}
+
+
+def async_url(url):
+    """The URL of a database with its driver swapped for an async one"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver known for {backend} databases")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+def _create_engine(url, options, pragmas, bind):
+    engine = create_async_engine(async_url(url), **options)
+    configure_engine(engine.sync_engine, pragmas)
+    RequestInstrumentation.instrument_engine(engine.sync_engine, bind)
+    return engine
+
+
+class AsyncDatabase:
+    """Async engines and sessions for the database configured on an app.
+
+    Uses the same URL, pool settings, SQLite pragmas and read bind as the
+    synchronous Flask-SQLAlchemy setup, through async drivers (aiosqlite,
+    asyncpg or aiomysql). Sessions from read_session() run on the read
+    bind when one is configured. Call probe() once the schema exists to
+    detect the search index, statistics summary table and jobs_version
+    counters.
+    """
+
+    def __init__(self, app=None):
+        self.engine = None
+        self.read_engine = None
+        self.features = {'fts': False, 'stats_summary': False, 'table_version': False}
+        self._sessions = None
+        self._read_sessions = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Create async engines for the databases of the app's Flask-SQLAlchemy engines"""
+        config = app.config
+        pragmas = {**SQLITE_PRAGMAS, **config.get('SQLITE_PRAGMAS', {})}
+        # Flask-SQLAlchemy has already resolved relative SQLite paths in these URLs
+        with app.app_context():
+            urls = {key: engine.url for key, engine in db.engines.items()}
+        self.engine = _create_engine(urls[None], engine_options(config), pragmas, 'async')
+
+        read = config.get('SQLALCHEMY_BINDS', {}).get(READ_BIND_KEY)
+        if read:
+            options = {k: v for k, v in read.items() if k != 'url'} if isinstance(read, dict) else {}
+            self.read_engine = _create_engine(urls[READ_BIND_KEY], options, pragmas, 'async_read')
+        else:
+            self.read_engine = self.engine
+
+        # Loaded attributes stay readable after commit, as handlers serialize committed jobs
+        self._sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+        self._read_sessions = async_sessionmaker(self.read_engine, expire_on_commit=False)
+        app.extensions['async_db'] = self
+
+    def session(self):
+        """A new AsyncSession on the primary database"""
+        return self._sessions()
+
+    def read_session(self):
+        """A new AsyncSession for read-only work, on the read bind if configured"""
+        return self._read_sessions()
+
+    async def probe(self):
+        """Detect the optional SQLite search index, statistics and version triggers"""
+        if self.engine.dialect.name != 'sqlite':
+            return self.features
+        async with self.engine.connect() as conn:
+            names = {name for (name,) in await conn.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE name IN ('jobs_fts', 'job_stats_ai', 'jobs_version_ai')"
+            )}
+        self.features = {'fts': 'jobs_fts' in names, 'stats_summary': 'job_stats_ai' in names,
+                         'table_version': 'jobs_version_ai' in names}
+        logger.info(f"Async database features: {self.features}")
+        return self.features
+
+    async def dispose(self):
+        await self.engine.dispose()
+        if self.read_engine is not self.engine:
+            await self.read_engine.dispose()
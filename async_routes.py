@@ -0,0 +1,405 @@
+import asyncio
+import logging
+from datetime import datetime
+from urllib.parse import urlencode
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response, StreamingResponse
+from starlette.routing import Route
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+from database import db
+from models import Job
+from search import apply_search
+import stats
+from signals import jobs_changed
+from response_cache import make_key
+from table_version import version_statement
+from serialization import RowSerializer, get_encoder
+from instrumentation import record_rows, timed
+from metrics import registry
+from batch import BatchError, parse_batch, create_jobs, update_jobs, delete_jobs
+from pagination import (DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, PaginationError, parse_fields,
+                        parse_limit, parse_sort, page_statement, split_page)
+from routes import NDJSON_MIMETYPE, filter_jobs, scrape_task_response
+from scrape_queue import scrape_params
+
+logger = logging.getLogger(__name__)
+
+BATCH_OPERATIONS = {'POST': create_jobs, 'PUT': update_jobs, 'DELETE': delete_jobs}
+
+
+def _json(request, payload, status=200, headers=None):
+    encoder = get_encoder(request.app.state.config.get('JSON_ENCODER', 'auto'))
+    return Response(encoder.dumps(payload), status_code=status, headers=headers, media_type='application/json')
+
+
+def _error(request, message, status):
+    return _json(request, {'error': message}, status)
+
+
+def _conditional(request, body, mimetype, etag, headers):
+    """Answer with body, or 304 if the client already holds it.
+
+    ETags are weak, as the response may be compressed on the way out.
+    """
+    headers = {**headers, 'ETag': f'W/"{etag}"'}
+    if_none_match = request.headers.get('if-none-match', '')
+    tags = {tag.strip().removeprefix('W/').strip('"') for tag in if_none_match.split(',')}
+    if etag in tags or '*' in tags:
+        return Response(status_code=304, headers=headers)
+    return Response(body, headers=headers, media_type=mimetype)
+
+
+async def _read_version(async_db):
+    """The shared (version, deletes) counters of the jobs table"""
+    async with async_db.read_session() as session:
+        row = (await session.execute(version_statement())).first()
+    return tuple(row) if row is not None else None
+
+
+async def get_jobs(request):
+    """Get jobs with filtering and sorting"""
+    args = request.query_params
+    accept = parse_accept_header(request.headers.get('accept'), MIMEAccept)
+    if accept.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE:
+        return await export_jobs(request)
+
+    config = request.app.state.config
+    async_db = request.app.state.async_db
+    cache = request.app.state.flask_app.extensions.get('response_cache')
+    if cache is not None and cache.max_entries > 0:
+        if async_db.features['table_version'] and cache.version_due():
+            cache.sync(await _read_version(async_db))
+        key = make_key(request.url.path, request.headers.get('accept', ''), args.multi_items())
+        entry = cache.lookup(key)
+        if entry is not None:
+            return _conditional(request, entry.body, entry.mimetype, entry.etag,
+                                {**entry.headers, 'X-Cache': 'HIT'})
+        version = cache.version
+    else:
+        cache = None
+
+    try:
+        query = filter_jobs(db.select(Job), args)
+        query, relevance = apply_search(query, args.get('q'), fts=async_db.features['fts'])
+        sort_by, sort_order = parse_sort(args, relevance)
+
+        fields = parse_fields(args.get('fields'))
+        limit = parse_limit(
+            args.get('limit'),
+            default=config.get('JOBS_PAGE_SIZE', DEFAULT_PAGE_SIZE),
+            maximum=config.get('JOBS_MAX_PAGE_SIZE', MAX_PAGE_SIZE)
+        )
+        statement = page_statement(query, sort_by, sort_order, fields, limit, cursor=args.get('cursor'),
+                                   sort_column=relevance if sort_by == 'relevance' else None)
+        async with async_db.read_session() as session:
+            rows = (await session.execute(statement)).all()
+        rows, next_cursor = split_page(rows, sort_by, sort_order, limit)
+
+        with timed('serialize'):
+            body = get_encoder(config.get('JSON_ENCODER', 'auto')).dumps(
+                RowSerializer(fields, sort_keys=True).serialize(rows))
+        record_rows(len(rows))
+
+    except PaginationError as e:
+        return _error(request, str(e), 400)
+    except Exception as e:
+        logger.error(f"Error fetching jobs: {e}")
+        return _error(request, 'Failed to fetch jobs', 500)
+
+    headers = {}
+    if next_cursor:
+        headers['X-Next-Cursor'] = next_cursor
+        next_url = f"{request.url.path}?{urlencode({**dict(args), 'cursor': next_cursor})}"
+        headers['Link'] = f'<{next_url}>; rel="next"'
+    if cache is None:
+        return Response(body, headers=headers, media_type='application/json')
+    etag = cache.store(key, version, body, headers, 'application/json')
+    return _conditional(request, body, 'application/json', etag, {**headers, 'X-Cache': 'MISS'})
+
+
+async def export_jobs(request):
+    """Stream all matching jobs as NDJSON or a chunked JSON array"""
+    args = request.query_params
+    try:
+        fields = parse_fields(args.get('fields'))
+        query = filter_jobs(db.select(Job), args)
+    except PaginationError as e:
+        return _error(request, str(e), 400)
+
+    output_format = args.get('format', 'ndjson')
+    if output_format not in ('ndjson', 'json'):
+        return _error(request, 'format must be ndjson or json', 400)
+
+    config = request.app.state.config
+    async_db = request.app.state.async_db
+    query, _ = apply_search(query, args.get('q'), fts=async_db.features['fts'])
+    query = query.with_only_columns(*[getattr(Job, f) for f in fields]).order_by(Job.id).execution_options(
+        yield_per=config.get('EXPORT_BATCH_SIZE', 1000))
+
+    serializer = RowSerializer(fields)
+    encoder = get_encoder(config.get('JSON_ENCODER', 'auto'))
+    separator = b',' if output_format == 'json' else b'\n'
+
+    def encode(rows):
+        record_rows(len(rows))
+        if output_format == 'json':
+            # Items of an encoded array, without its brackets
+            return encoder.dumps(serializer.serialize(rows))[1:-1]
+        return b'\n'.join(encoder.dumps(serializer(row)) for row in rows)
+
+    async def generate():
+        # Rows are streamed from the database one batch per chunk
+        try:
+            async with async_db.read_session() as session:
+                result = await session.stream(query)
+                if output_format == 'json':
+                    yield b'['
+                first = True
+                async for rows in result.partitions():
+                    yield (b'' if first else separator) + encode(rows)
+                    first = False
+                if output_format == 'json':
+                    yield b']'
+                elif not first:
+                    yield b'\n'
+        except Exception as e:
+            logger.error(f"Error exporting jobs: {e}")
+            raise
+
+    mimetype = 'application/json' if output_format == 'json' else NDJSON_MIMETYPE
+    return StreamingResponse(generate(), media_type=mimetype)
+
+
+async def add_job(request):
+    """Add a new job listing"""
+    try:
+        data = await request.json()
+
+        # Validate required fields
+        required_fields = ['title', 'company', 'location']
+        if not all(field in data for field in required_fields):
+            return _error(request, 'Missing required fields', 400)
+
+        new_job = Job(
+            title=data['title'],
+            company=data['company'],
+            location=data['location'],
+            description=data.get('description', ''),
+            salary=data.get('salary', ''),
+            job_type=data.get('job_type', 'Full-time'),
+            experience_level=data.get('experience_level', 'Not specified'),
+            application_url=data.get('application_url', ''),
+            scraped=False,
+            posted_date=datetime.utcnow()
+        )
+
+        async with request.app.state.async_db.session() as session:
+            session.add(new_job)
+            await session.commit()
+        jobs_changed.send(request.app.state.flask_app)
+
+        return _json(request, {
+            'message': 'Job added successfully',
+            'job': new_job.to_dict()
+        }, 201)
+
+    except IntegrityError:
+        return _error(request, 'Job already exists', 409)
+    except Exception as e:
+        logger.error(f"Error adding job: {e}")
+        return _error(request, 'Failed to add job', 500)
+
+
+async def batch_jobs(request):
+    """Create (POST), update (PUT) or delete (DELETE) many jobs in one transaction.
+
+    The batch runs the synchronous bulk statements in a worker thread, in
+    the Flask app's context, so it never blocks the event loop.
+    """
+    flask_app = request.app.state.flask_app
+    try:
+        items = parse_batch(await request.body(), request.headers.get('content-type', '').split(';')[0].strip(),
+                            request.app.state.config.get('BATCH_MAX_ITEMS', 10000))
+        operation = BATCH_OPERATIONS[request.method]
+
+        def run():
+            with flask_app.app_context():
+                try:
+                    results = operation(items)
+                    db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    raise
+            return results
+
+        results = await run_in_threadpool(run)
+
+        succeeded = sum(1 for result in results if result['status'] != 'error')
+        if succeeded:
+            jobs_changed.send(flask_app)
+
+        return _json(request, {
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded,
+            'results': results
+        })
+
+    except BatchError as e:
+        return _error(request, str(e), 400)
+    except IntegrityError:
+        return _error(request, 'Batch conflicts with existing jobs', 409)
+    except Exception as e:
+        logger.error(f"Error processing job batch: {e}")
+        return _error(request, 'Failed to process batch', 500)
+
+
+async def delete_job(request):
+    """Delete a job listing"""
+    job_id = request.path_params['job_id']
+    try:
+        async with request.app.state.async_db.session() as session:
+            job = await session.get(Job, job_id)
+            if job is None:
+                return _error(request, 'Job not found', 404)
+            await session.delete(job)
+            await session.commit()
+        jobs_changed.send(request.app.state.flask_app)
+        return _json(request, {'message': 'Job deleted successfully'})
+    except Exception as e:
+        logger.error(f"Error deleting job {job_id}: {e}")
+        return _error(request, 'Failed to delete job', 500)
+
+
+async def update_job(request):
+    """Update a job listing"""
+    job_id = request.path_params['job_id']
+    try:
+        async with request.app.state.async_db.session() as session:
+            job = await session.get(Job, job_id)
+            if job is None:
+                return _error(request, 'Job not found', 404)
+            data = await request.json()
+
+            # Update fields if provided
+            for field in Job.EDITABLE_FIELDS:
+                if field in data:
+                    setattr(job, field, data[field])
+
+            await session.commit()
+        jobs_changed.send(request.app.state.flask_app)
+        return _json(request, {
+            'message': 'Job updated successfully',
+            'job': job.to_dict()
+        })
+
+    except IntegrityError:
+        return _error(request, 'A job with this title, company and location already exists', 409)
+    except Exception as e:
+        logger.error(f"Error updating job {job_id}: {e}")
+        return _error(request, 'Failed to update job', 500)
+
+
+async def get_stats(request):
+    """Get job statistics"""
+    try:
+        try:
+            top = max(1, min(int(request.query_params.get('top', 5)), 50))
+        except ValueError:
+            return _error(request, 'top must be an integer', 400)
+
+        async_db = request.app.state.async_db
+        if async_db.features['table_version']:
+            stats.sync_stats_version(await _read_version(async_db))
+        key = (str(async_db.read_engine.url), top)
+        result = stats.cached_stats(key)
+        if result is None:
+            summary = async_db.features['stats_summary']
+            async with async_db.read_session() as session:
+                result = await session.run_sync(
+                    lambda sync_session: stats.compute_stats(top, session=sync_session, summary=summary))
+            stats.cache_stats(key, result, request.app.state.config.get('STATS_CACHE_TTL', 5.0))
+        return _json(request, result)
+
+    except Exception as e:
+        logger.error(f"Error fetching stats: {e}")
+        return _error(request, 'Failed to fetch statistics', 500)
+
+
+async def trigger_scraping(request):
+    """Queue a LinkedIn scrape and return its task id, or its result if it finishes within wait seconds.
+
+    The scrape runs on the scrape queue's worker threads; waiting for it
+    only suspends this request.
+    """
+    try:
+        data = {}
+        if await request.body():
+            try:
+                data = await request.json()
+            except ValueError:
+                pass
+        try:
+            queries, max_pages, wait = scrape_params(data, request.query_params, request.app.state.config)
+        except ValueError as e:
+            return _error(request, str(e), 400)
+
+        task, created = request.app.state.flask_app.extensions['scrape_queue'].submit(queries, max_pages)
+        if wait and not task.done:
+            try:
+                # Shielded so that timing out does not cancel the scrape itself
+                await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(task.future)), wait)
+            except asyncio.TimeoutError:
+                pass
+
+        body, status = scrape_task_response(task, created)
+        status_url = request.app.url_path_for('get_scrape_task', task_id=task.id)
+        return _json(request, {**body, 'status_url': status_url}, status, headers={'Location': status_url})
+
+    except Exception as e:
+        logger.error(f"Error queuing scraping: {e}")
+        return _error(request, str(e), 500)
+
+
+async def get_scrape_task(request):
+    """Get the status and result of a scrape task"""
+    task = request.app.state.flask_app.extensions['scrape_queue'].get(request.path_params['task_id'])
+    if task is None:
+        return _error(request, 'Task not found', 404)
+    return _json(request, task.to_dict())
+
+
+async def get_schedule(request):
+    """Scheduled scrapes and retention policy, with their last runs"""
+    return _json(request, request.app.state.flask_app.extensions['scrape_scheduler'].to_dict())
+
+
+async def get_metrics(request):
+    """Request, SQL and scraper metrics in the Prometheus text format"""
+    return Response(registry.render(), media_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+async def health_check(request):
+    """Health check endpoint"""
+    return _json(request, {
+        'status': 'healthy',
+        'timestamp': datetime.utcnow().isoformat()
+    })
+
+
+# The /api routes of routes.api_bp, with async handlers
+routes = [
+    Route('/api/jobs', get_jobs, methods=['GET']),
+    Route('/api/jobs', add_job, methods=['POST']),
+    Route('/api/jobs/export', export_jobs, methods=['GET']),
+    Route('/api/jobs/batch', batch_jobs, methods=['POST', 'PUT', 'DELETE']),
+    Route('/api/jobs/{job_id:int}', delete_job, methods=['DELETE']),
+    Route('/api/jobs/{job_id:int}', update_job, methods=['PUT']),
+    Route('/api/stats', get_stats, methods=['GET']),
+    Route('/api/scrape', trigger_scraping, methods=['GET', 'POST']),
+    Route('/api/scrape/{task_id}', get_scrape_task, methods=['GET']),
+    Route('/api/schedule', get_schedule, methods=['GET']),
+    Route('/api/metrics', get_metrics, methods=['GET']),
+    Route('/api/health', health_check, methods=['GET']),
+]
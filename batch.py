@@ -0,0 +1,200 @@
+import json
+import logging
+from database import db
+from models import Job, make_dedup_key
+from ingest import LOOKUP_CHUNK_SIZE, build_job_row, find_existing_keys, insert_new_rows
+from enrichment import salary_columns
+from near_duplicates import TEXT_FIELDS, index_jobs, reindex_jobs
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_FIELDS = ('title', 'company', 'location')
+
+
+class BatchError(ValueError):
+    """Raised when a batch request body cannot be parsed at all"""
+
+
+def parse_batch(body, mimetype, max_items):
+    """Parse a JSON array or NDJSON body into items.
+
+    Lines of NDJSON that are not valid JSON become BatchError instances in
+    the returned list so they can be reported per item.
+    """
+    if mimetype == 'application/x-ndjson':
+        items = []
+        for line in body.decode('utf-8').splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as e:
+                items.append(BatchError(f'Invalid JSON: {e}'))
+    else:
+        try:
+            items = json.loads(body or b'null')
+        except ValueError as e:
+            raise BatchError(f'Invalid JSON: {e}')
+        if isinstance(items, dict):
+            items = items.get('jobs', items.get('ids'))
+        if not isinstance(items, list):
+            raise BatchError('Expected a JSON array or NDJSON body')
+
+    if len(items) > max_items:
+        raise BatchError(f'Batch too large (max {max_items} items)')
+    return items
+
+
+def _validate_fields(item, required=()):
+    """Return an error message for an invalid job payload, or None"""
+    if isinstance(item, BatchError):
+        return str(item)
+    if not isinstance(item, dict):
+        return 'Expected a JSON object'
+    if not all(item.get(field) for field in required):
+        return 'Missing required fields'
+    for field in Job.EDITABLE_FIELDS:
+        if field in item and item[field] is not None and not isinstance(item[field], str):
+            return f'Field {field} must be a string'
+    return None
+
+
+def _chunks(values):
+    values = list(values)
+    for start in range(0, len(values), LOOKUP_CHUNK_SIZE):
+        yield values[start:start + LOOKUP_CHUNK_SIZE]
+
+
+def create_jobs(items):
+    """Insert every valid, non-duplicate job in one batch.
+
+    Rows go through ingest.insert_new_rows, so a job whose dedup key a
+    concurrent writer stored after the existence check is skipped rather
+    than failing the batch, and reported as already existing too.
+    Returns per-item results in input order. The caller commits.
+    """
+    results = [None] * len(items)
+    rows = {}
+    for index, item in enumerate(items):
+        error = _validate_fields(item, REQUIRED_FIELDS)
+        if error:
+            results[index] = {'index': index, 'status': 'error', 'error': error}
+            continue
+        row = build_job_row(item, scraped=False)
+        if row['dedup_key'] in rows:
+            results[index] = {'index': index, 'status': 'error', 'error': 'Duplicate job in batch'}
+            continue
+        rows[row['dedup_key']] = (index, row)
+
+    existing = find_existing_keys(rows)
+    for key in existing:
+        index, _ = rows.pop(key)
+        results[index] = {'index': index, 'status': 'error', 'error': 'Job already exists'}
+
+    if rows:
+        inserted = insert_new_rows([row for _, row in rows.values()])
+        for key, (index, _) in rows.items():
+            if key in inserted:
+                results[index] = {'index': index, 'status': 'created', 'id': inserted[key]}
+            else:
+                results[index] = {'index': index, 'status': 'error', 'error': 'Job already exists'}
+        # Bulk inserts bypass the model events that index new jobs
+        index_jobs([{**rows[key][1], 'id': job_id} for key, job_id in inserted.items()])
+
+    return results
+
+
+def update_jobs(items):
+    """Apply partial updates to existing jobs with one executemany UPDATE.
+
+    Each item holds an id and the fields to change. Returns per-item
+    results in input order. The caller commits.
+    """
+    results = [None] * len(items)
+    updates = {}
+    for index, item in enumerate(items):
+        error = _validate_fields(item)
+        if not error and (not isinstance(item.get('id'), int) or isinstance(item['id'], bool)):
+            error = 'Missing or invalid id'
+        elif not error and item['id'] in updates:
+            error = 'Duplicate id in batch'
+        elif not error and any(field in item and not item[field] for field in REQUIRED_FIELDS):
+            error = 'Required fields cannot be empty'
+        if error:
+            results[index] = {'index': index, 'status': 'error', 'error': error}
+            continue
+        changes = {field: item[field] for field in Job.EDITABLE_FIELDS if field in item}
+        if 'salary' in changes:
+            # Bulk updates bypass the model events that derive these
+            changes.update(salary_columns(changes['salary']))
+        updates[item['id']] = (index, changes)
+
+    # Current identity fields of every targeted job, for existence and dedup checks
+    current = {}
+    for chunk in _chunks(updates):
+        for job_id, title, company, location, key in db.session.query(
+            Job.id, Job.title, Job.company, Job.location, Job.dedup_key
+        ).filter(Job.id.in_(chunk)):
+            current[job_id] = {'title': title, 'company': company, 'location': location, 'dedup_key': key}
+
+    new_keys = {}
+    for job_id, (index, changes) in list(updates.items()):
+        if job_id not in current:
+            results[index] = {'index': index, 'status': 'error', 'error': 'Job not found'}
+            del updates[job_id]
+            continue
+        if any(field in changes for field in REQUIRED_FIELDS):
+            merged = {**current[job_id], **changes}
+            key = make_dedup_key(merged['title'], merged['company'], merged['location'])
+            if key != current[job_id]['dedup_key']:
+                changes['dedup_key'] = key
+                new_keys.setdefault(key, []).append(job_id)
+
+    # A new key may not collide with another job, in the table or in the batch
+    taken = find_existing_keys(new_keys)
+    for key, job_ids in new_keys.items():
+        if key in taken or len(job_ids) > 1:
+            for job_id in job_ids:
+                index, _ = updates.pop(job_id)
+                results[index] = {'index': index, 'status': 'error',
+                                  'error': 'A job with this title, company and location already exists'}
+
+    rows = [{'id': job_id, **changes} for job_id, (_, changes) in updates.items() if changes]
+    if rows:
+        db.session.execute(db.update(Job), rows)
+        reindex_jobs(row['id'] for row in rows if any(field in row for field in TEXT_FIELDS))
+    for job_id, (index, _) in updates.items():
+        results[index] = {'index': index, 'status': 'updated', 'id': job_id}
+
+    return results
+
+
+def delete_jobs(items):
+    """Delete jobs by id with chunked DELETE ... WHERE id IN statements.
+
+    Items are ids or objects with an id. Returns per-item results in input
+    order. The caller commits.
+    """
+    results = [None] * len(items)
+    ids = {}
+    for index, item in enumerate(items):
+        job_id = item.get('id') if isinstance(item, dict) else item
+        if not isinstance(job_id, int) or isinstance(job_id, bool):
+            results[index] = {'index': index, 'status': 'error', 'error': 'Missing or invalid id'}
+        elif job_id in ids:
+            results[index] = {'index': index, 'status': 'error', 'error': 'Duplicate id in batch'}
+        else:
+            ids[job_id] = index
+
+    for chunk in _chunks(ids):
+        found = {job_id for (job_id,) in db.session.query(Job.id).filter(Job.id.in_(chunk))}
+        if found:
+            db.session.query(Job).filter(Job.id.in_(found)).delete(synchronize_session=False)
+        for job_id in chunk:
+            index = ids[job_id]
+            if job_id in found:
+                results[index] = {'index': index, 'status': 'deleted', 'id': job_id}
+            else:
+                results[index] = {'index': index, 'status': 'error', 'error': 'Job not found'}
+
+    return results
@@ -0,0 +1,4 @@
+"""Benchmark and load-test harness for the API and the scraper.
+
+Run with ``python -m benchmarks --help`` from the project root.
+"""
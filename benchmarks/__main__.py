@@ -0,0 +1,112 @@
+import os
+import sys
+import shutil
+import logging
+import argparse
+from benchmarks.datasets import parse_size, ensure_dataset
+from benchmarks.harness import print_results, save_results, compare_results, DEFAULT_REGRESSION_THRESHOLD
+
+
+def _csv(value):
+    return [v.strip() for v in value.split(',') if v.strip()]
+
+
+def _add_report_options(parser):
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--compare', metavar='BASELINE', help='Compare with results saved by --output')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                        help='Relative slowdown reported as a regression (default 0.2)')
+
+
+def _seed(args):
+    for rows in args.rows:
+        print(ensure_dataset(rows, args.database, reseed=args.reseed))
+    return []
+
+
+def _api(args):
+    from benchmarks.api import make_app, run_api_benchmarks
+
+    results = []
+    for rows in args.rows:
+        dataset = ensure_dataset(rows, args.database, reseed=args.reseed)
+        # Run on a copy so writes from create_job and ingest do not leak into later runs
+        working = f'{dataset}.run'
+        shutil.copyfile(dataset, working)
+        try:
+            app = make_app(working, cache=args.cache)
+            results.extend(run_api_benchmarks(app, rows, args.scenarios, args.requests, args.concurrency))
+        finally:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(working + suffix):
+                    os.remove(working + suffix)
+    return results
+
+
+def _extract(args):
+    from benchmarks.extraction import load_fixtures, run_parse_benchmarks, run_browser_benchmarks, FIXTURES_DIR
+
+    fixtures = load_fixtures(args.fixtures or FIXTURES_DIR)
+    if not fixtures:
+        sys.exit('No *.html fixtures found')
+    results = run_parse_benchmarks(fixtures, args.iterations * 10)
+    if not args.no_browser:
+        results.extend(run_browser_benchmarks(fixtures, args.iterations))
+    return results
+
+
+def main(argv=None):
+    from benchmarks.api import SCENARIOS
+
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description='Benchmark and load-test the API and the scraper')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    seed = commands.add_parser('seed', help='Seed benchmark databases with synthetic jobs')
+    api = commands.add_parser('api', help='Load-test the API against seeded databases')
+    for command in (seed, api):
+        command.add_argument('--rows', type=lambda v: [parse_size(r) for r in _csv(v)], default=[10000],
+                             help='Comma separated dataset sizes, e.g. 10k,100k,1m (default 10k)')
+        command.add_argument('--database', help='Database file (default: one per size in the temp directory)')
+        command.add_argument('--reseed', action='store_true', help='Rebuild datasets even if present')
+    seed.set_defaults(run=_seed)
+
+    api.add_argument('--scenarios', type=_csv, default=list(SCENARIOS),
+                     help=f"Comma separated scenarios (default all: {', '.join(SCENARIOS)})")
+    api.add_argument('--requests', type=int, default=500, help='Operations per scenario (default 500)')
+    api.add_argument('--concurrency', type=lambda v: [int(c) for c in _csv(v)], default=[1, 8],
+                     help='Comma separated thread counts (default 1,8)')
+    api.add_argument('--cache', action='store_true', help='Keep response and stats caching enabled')
+    api.set_defaults(run=_api)
+    _add_report_options(api)
+
+    extract = commands.add_parser('extract', help='Benchmark job card extraction on saved HTML pages')
+    extract.add_argument('--fixtures', help='Directory of saved search results pages')
+    extract.add_argument('--iterations', type=int, default=20, help='Extractions per fixture in the browser (default 20)')
+    extract.add_argument('--no-browser', action='store_true', help='Only benchmark HTML parsing')
+    extract.set_defaults(run=_extract)
+    _add_report_options(extract)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, force=True)
+    logging.getLogger('benchmarks').setLevel(logging.INFO)
+
+    unknown = set(getattr(args, 'scenarios', ())) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    if getattr(args, 'database', None) and len(args.rows) > 1:
+        parser.error('--database can only be used with a single --rows size')
+
+    results = args.run(args)
+    if not results:
+        return 0
+    print_results(results)
+    if args.output:
+        save_results(results, args.output)
+    if args.compare and compare_results(results, args.compare, args.threshold):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
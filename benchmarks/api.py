@@ -0,0 +1,145 @@
+import os
+import random
+import itertools
+import threading
+from benchmarks.datasets import synthetic_job, LOCATIONS, JOB_TYPES, EXPERIENCE_LEVELS, SKILLS
+from benchmarks.harness import run_load
+
+PAGE_SIZE = 50
+INGEST_BATCH_SIZE = 100
+
+_ids = itertools.count()
+_ids_lock = threading.Lock()
+
+
+def _unique_index():
+    """Index of a synthetic job that no dataset contains"""
+    with _ids_lock:
+        return 10 ** 9 + next(_ids)
+
+
+def _get(client, url):
+    return client.get(url).status_code == 200
+
+
+def _jobs_page(client, rng):
+    return _get(client, f'/api/jobs?limit={PAGE_SIZE}')
+
+
+def _jobs_by_company(client, rng):
+    return _get(client, f'/api/jobs?limit={PAGE_SIZE}&company=company {rng.randrange(1, 50)}')
+
+
+def _jobs_by_type_and_level(client, rng):
+    return _get(client, f'/api/jobs?limit={PAGE_SIZE}&job_type={rng.choice(JOB_TYPES)}'
+                        f'&experience={rng.choice(EXPERIENCE_LEVELS)}')
+
+
+def _jobs_by_location_sorted(client, rng):
+    return _get(client, f'/api/jobs?limit={PAGE_SIZE}&location={rng.choice(LOCATIONS)}'
+                        f'&sort_by=title&sort_order=asc')
+
+
+def _jobs_search(client, rng):
+    return _get(client, f'/api/jobs?limit={PAGE_SIZE}&q={rng.choice(SKILLS)}')
+
+
+def _jobs_by_salary_sorted(client, rng):
+    return _get(client, f'/api/jobs?limit={PAGE_SIZE}&min_salary={rng.randrange(60, 250) * 1000}'
+                        f'&sort_by=salary_max')
+
+
+def _stats(client, rng):
+    return _get(client, '/api/stats')
+
+
+def _create_job(client, rng):
+    job = synthetic_job(rng, _unique_index())
+    job.pop('posted_date')
+    job.pop('scraped')
+    return client.post('/api/jobs', json=job).status_code == 201
+
+
+def _paginate_worker(client, rng, max_pages=20):
+    """Each call fetches the next page of a cursor walk, restarting after max_pages"""
+    state = {'cursor': None, 'page': 0}
+
+    def operation():
+        url = f'/api/jobs?limit={PAGE_SIZE}'
+        if state['cursor']:
+            url += f"&cursor={state['cursor']}"
+        response = client.get(url)
+        state['cursor'] = response.headers.get('X-Next-Cursor')
+        state['page'] += 1
+        if state['page'] >= max_pages:
+            state['cursor'], state['page'] = None, 0
+        return response.status_code == 200
+    return operation
+
+
+def _ingest_worker(app, rng):
+    """Each call ingests a batch of scraped jobs, half of them seen in earlier batches"""
+    from database import db
+    from ingest import upsert_scraped_jobs
+
+    seen = []
+
+    def operation():
+        fresh = [synthetic_job(rng, _unique_index()) for _ in range(INGEST_BATCH_SIZE // 2)]
+        repeated = rng.sample(seen, min(len(seen), INGEST_BATCH_SIZE - len(fresh)))
+        seen.extend(fresh)
+        with app.app_context():
+            try:
+                upsert_scraped_jobs(fresh + repeated)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+    return operation
+
+
+# Scenario name -> request made by each operation
+REQUEST_SCENARIOS = {
+    'jobs_page': _jobs_page,
+    'jobs_by_company': _jobs_by_company,
+    'jobs_by_type_and_level': _jobs_by_type_and_level,
+    'jobs_by_location_sorted': _jobs_by_location_sorted,
+    'jobs_search': _jobs_search,
+    'jobs_by_salary_sorted': _jobs_by_salary_sorted,
+    'stats': _stats,
+    'create_job': _create_job,
+}
+SCENARIOS = (*REQUEST_SCENARIOS, 'jobs_paginate', 'ingest')
+
+
+def make_app(database, cache=False):
+    """Create the app on a benchmark database, with response caching off unless cache is set"""
+    from app import create_app
+
+    os.environ['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{database}'
+    if not cache:
+        os.environ['RESPONSE_CACHE_MAX_ENTRIES'] = '0'
+        os.environ['STATS_CACHE_TTL'] = '0'
+    return create_app()
+
+
+def run_api_benchmarks(app, rows, scenarios=SCENARIOS, requests=500, concurrency=(1,), seed=42):
+    """Drive each scenario through per-thread test clients at each concurrency level"""
+    seeds = itertools.count(seed)
+    results = []
+    for name in scenarios:
+        for threads in concurrency:
+            def make_worker(name=name):
+                rng = random.Random(next(seeds))
+                if name == 'ingest':
+                    return _ingest_worker(app, rng)
+                client = app.test_client()
+                if name == 'jobs_paginate':
+                    return _paginate_worker(client, rng)
+                request = REQUEST_SCENARIOS[name]
+                return lambda: request(client, rng)
+
+            operations = max(1, requests // 10) if name == 'ingest' else requests
+            results.append(run_load(name, make_worker, operations, threads,
+                                    warmup=min(5, operations), rows=rows))
+    return results
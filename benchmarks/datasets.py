@@ -0,0 +1,120 @@
+import os
+import random
+import logging
+import tempfile
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+INSERT_BATCH_SIZE = 5000
+
+# Vocabulary of the synthetic listings, skewed like real search results
+TITLES = ['Software Engineer', 'Senior Software Engineer', 'Backend Developer', 'Frontend Developer',
+          'Full Stack Engineer', 'Data Engineer', 'Data Scientist', 'DevOps Engineer',
+          'Machine Learning Engineer', 'Site Reliability Engineer', 'Engineering Manager',
+          'Junior Developer', 'Staff Engineer', 'Mobile Developer', 'QA Engineer']
+SKILLS = ['Python', 'JavaScript', 'React', 'Node', 'AWS', 'Docker', 'Kubernetes', 'Go', 'Java',
+          'SQL', 'TypeScript', 'Rust', 'Django', 'Flask', 'Spark', 'Terraform']
+LOCATIONS = ['Remote', 'New York, NY', 'San Francisco, CA', 'Seattle, WA', 'Austin, TX', 'Boston, MA',
+             'Chicago, IL', 'Denver, CO', 'London, UK', 'Berlin, Germany', 'Toronto, Canada',
+             'Amsterdam, Netherlands', 'Bangalore, India', 'Sydney, Australia']
+JOB_TYPES = ['Full-time', 'Full-time', 'Full-time', 'Contract', 'Part-time', 'Internship']
+EXPERIENCE_LEVELS = ['Senior', 'Mid-Senior', 'Mid-level', 'Entry level', 'Not specified']
+WORDS = ('build scalable services with a small team ship features own systems end to end '
+         'collaborate across product and design improve reliability mentor engineers').split()
+
+COMPANY_COUNT = 2000
+POSTED_WINDOW_DAYS = 90
+
+
+def parse_size(value):
+    """Parse a row count such as 10000, 10k or 1m"""
+    value = str(value).strip().lower()
+    multiplier = {'k': 1000, 'm': 1000000}.get(value[-1:], 1)
+    return int(float(value.rstrip('km')) * multiplier)
+
+
+def default_database(rows):
+    """Path of the benchmark database seeded with the given number of rows"""
+    return os.path.join(tempfile.gettempdir(), f'jobs-bench-{rows}.db')
+
+
+def synthetic_job(rng, index, now=None):
+    """A plausible job listing, unique per index"""
+    now = now or datetime.utcnow()
+    title = rng.choice(TITLES)
+    skills = rng.sample(SKILLS, 3)
+    return {
+        'title': f"{title} ({', '.join(skills[:2])}) #{index}",
+        'company': f'Company {int(rng.paretovariate(1.2)) % COMPANY_COUNT}',
+        'location': rng.choice(LOCATIONS),
+        'description': ' '.join(rng.choices(WORDS, k=40) + skills),
+        'salary': f'${rng.randrange(60, 250)}k' if rng.random() < 0.4 else '',
+        'job_type': rng.choice(JOB_TYPES),
+        'experience_level': rng.choice(EXPERIENCE_LEVELS),
+        'application_url': f'https://www.linkedin.com/jobs/view/{1000000 + index}',
+        'posted_date': now - timedelta(seconds=rng.randrange(POSTED_WINDOW_DAYS * 86400)),
+        'scraped': rng.random() < 0.7,
+    }
+
+
+def count_jobs(path):
+    """Number of jobs in a database file, or None if it has no jobs table"""
+    import sqlite3
+
+    if not os.path.exists(path):
+        return None
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute('SELECT COUNT(*) FROM jobs').fetchone()[0]
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+
+
+def seed_database(app, rows, seed=42):
+    """Fill an empty database with rows synthetic jobs and build its indexes.
+
+    Rows are inserted before init_db installs the search and statistics
+    triggers, which then build their tables in one pass.
+    """
+    from database import db, init_db
+    from ingest import build_job_row
+    from models import Job
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    with app.app_context():
+        db.create_all()
+        for start in range(0, rows, INSERT_BATCH_SIZE):
+            batch = []
+            for index in range(start, min(rows, start + INSERT_BATCH_SIZE)):
+                job = synthetic_job(rng, index, now)
+                batch.append(build_job_row(job, scraped=job['scraped'], posted_date=job['posted_date']))
+            db.session.execute(db.insert(Job), batch)
+            db.session.commit()
+            if (start + len(batch)) % 100000 == 0:
+                logger.info(f"Inserted {start + len(batch)}/{rows} jobs")
+    init_db(app)
+    with app.app_context():
+        with db.engine.begin() as conn:
+            conn.exec_driver_sql('ANALYZE')
+        with db.engine.connect() as conn:
+            # Fold the WAL into the database file so it can be copied on its own
+            conn.exec_driver_sql('PRAGMA wal_checkpoint(TRUNCATE)')
+
+
+def ensure_dataset(rows, path=None, reseed=False):
+    """Seed the benchmark database for rows unless it already holds them, returning its path"""
+    from app import create_app
+
+    path = path or default_database(rows)
+    if reseed or count_jobs(path) != rows:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        logger.info(f"Seeding {rows} jobs into {path}")
+        os.environ['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+        seed_database(create_app(), rows)
+    return path
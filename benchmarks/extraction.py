@@ -0,0 +1,66 @@
+import glob
+import logging
+import os
+from pathlib import Path
+from benchmarks.harness import run_load
+
+logger = logging.getLogger(__name__)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+FIXTURE_BASE_URL = 'https://www.linkedin.com'
+
+
+def load_fixtures(directory=FIXTURES_DIR):
+    """Saved search results pages, as (name, path) pairs"""
+    return [(Path(path).stem, path) for path in sorted(glob.glob(os.path.join(directory, '*.html')))]
+
+
+def run_parse_benchmarks(fixtures, iterations=200, limit=None):
+    """Time the HTTP backend's lxml card parsing on each fixture"""
+    from http_scraper import parse_job_cards
+
+    results = []
+    for name, path in fixtures:
+        with open(path, encoding='utf-8') as f:
+            page_html = f.read()
+
+        def make_worker():
+            return lambda: bool(parse_job_cards(page_html, FIXTURE_BASE_URL, limit))
+
+        results.append(run_load(f'parse:{name}', make_worker, iterations, warmup=5))
+    return results
+
+
+def run_browser_benchmarks(fixtures, iterations=20, limit=25, modes=('script', 'elements')):
+    """Time _extract_linkedin_jobs on each fixture loaded in a local headless browser.
+
+    Returns no results, with a warning, when Chrome cannot be started.
+    """
+    from selenium_scraper import JobScraper, create_driver
+
+    try:
+        driver = create_driver(headless=True)
+    except Exception as e:
+        logger.warning(f"Skipping browser extraction benchmarks, Chrome unavailable: {e}")
+        return []
+
+    results = []
+    try:
+        # Missing optional fields must not wait out the implicit wait
+        driver.implicitly_wait(0)
+        for name, path in fixtures:
+            driver.get(Path(path).resolve().as_uri())
+            for mode in modes:
+                scraper = JobScraper(driver=driver, card_delay=0, extraction=mode)
+                cards = scraper._find_linkedin_job_cards(limit=limit)
+                if not cards:
+                    logger.warning(f"No job cards found in fixture {name}")
+                    break
+
+                def make_worker(scraper=scraper, cards=cards):
+                    return lambda: bool(scraper._extract_linkedin_jobs(cards))
+
+                results.append(run_load(f'extract_{mode}:{name}', make_worker, iterations, warmup=2))
+    finally:
+        driver.quit()
+    return results
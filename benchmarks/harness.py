@@ -0,0 +1,168 @@
+import os
+import json
+import math
+import time
+import resource
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Relative slowdown of p50/p99 or throughput reported as a regression
+DEFAULT_REGRESSION_THRESHOLD = 0.2
+
+
+class PeakRSS:
+    """Tracks the peak resident set size of this process while active.
+
+    Samples /proc/self/statm where available and falls back to the
+    lifetime peak reported by getrusage.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._page_size = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+    def sample(self):
+        try:
+            with open('/proc/self/statm') as f:
+                rss = int(f.read().split()[1]) * self._page_size
+        except (OSError, IndexError, ValueError):
+            # ru_maxrss is in KiB on Linux and bytes on macOS
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            rss *= 1 if os.uname().sysname == 'Darwin' else 1024
+        self.peak = max(self.peak, rss)
+        return rss
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def __enter__(self):
+        self.sample()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, math.ceil(fraction * len(values)) - 1))
+    return values[index]
+
+
+def run_load(name, make_worker, total, concurrency=1, warmup=0, **labels):
+    """Run total operations across concurrency threads and summarize them.
+
+    make_worker() is called once per thread and returns the operation to
+    time; an operation that raises or returns False counts as an error.
+    """
+    workers = [make_worker() for _ in range(concurrency)]
+    for _ in range(warmup):
+        workers[0]()
+
+    latencies = []
+    errors = 0
+    remaining = [total]
+    lock = threading.Lock()
+
+    def drive(operation):
+        nonlocal errors
+        local = []
+        failed = 0
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    break
+                remaining[0] -= 1
+            start = time.perf_counter()
+            try:
+                ok = operation() is not False
+            except Exception:
+                ok = False
+            local.append(time.perf_counter() - start)
+            failed += not ok
+        with lock:
+            latencies.extend(local)
+            errors += failed
+
+    with PeakRSS() as rss:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(drive, workers))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'name': name,
+        **labels,
+        'concurrency': concurrency,
+        'operations': len(latencies),
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'throughput': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'peak_rss_mb': round(rss.peak / (1024 * 1024), 1),
+    }
+
+
+def result_key(result):
+    """Identity of a result used to match it against a baseline"""
+    return (result['name'], result.get('rows'), result['concurrency'])
+
+
+def print_results(results):
+    """Print results as an aligned table"""
+    header = ('scenario', 'rows', 'conc', 'ops', 'err', 'p50 ms', 'p99 ms', 'ops/s', 'rss MB')
+    rows = [
+        (r['name'], r.get('rows', '') or '', r['concurrency'], r['operations'], r['errors'],
+         f"{r['p50_ms']:.2f}", f"{r['p99_ms']:.2f}", f"{r['throughput']:.1f}", f"{r['peak_rss_mb']:.1f}")
+        for r in results
+    ]
+    widths = [max(len(str(v)) for v in column) for column in zip(header, *rows)]
+    for row in (header, *rows):
+        print('  '.join(str(v).ljust(w) if i == 0 else str(v).rjust(w) for i, (v, w) in enumerate(zip(row, widths))))
+
+
+def save_results(results, path):
+    with open(path, 'w') as f:
+        json.dump({'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'results': results}, f, indent=2)
+
+
+def compare_results(results, baseline_path, threshold=DEFAULT_REGRESSION_THRESHOLD):
+    """Print changes against a saved baseline, returning the regressed results"""
+    with open(baseline_path) as f:
+        baseline = {result_key(r): r for r in json.load(f)['results']}
+
+    regressions = []
+    for result in results:
+        before = baseline.get(result_key(result))
+        if before is None:
+            continue
+        changes = {
+            'p50': _ratio(result['p50_ms'], before['p50_ms']),
+            'p99': _ratio(result['p99_ms'], before['p99_ms']),
+            'throughput': _ratio(before['throughput'], result['throughput']),
+        }
+        regressed = [metric for metric, ratio in changes.items() if ratio > 1 + threshold]
+        summary = ', '.join(f'{metric} x{ratio:.2f}' for metric, ratio in changes.items())
+        flag = 'REGRESSION' if regressed else 'ok'
+        print(f"{flag:<10}  {result['name']} rows={result.get('rows')} conc={result['concurrency']}: {summary}")
+        if regressed:
+            regressions.append(result)
+    return regressions
+
+
+def _ratio(value, reference):
+    """How many times worse value is than reference, for lower-is-better metrics"""
+    if not reference:
+        return 1.0
+    return value / reference
@@ -0,0 +1,84 @@
+import time
+from datetime import timedelta
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from database import init_db
+from near_duplicates import DEFAULT_THRESHOLD, compact_near_duplicates
+from retention import RETENTION_MODES, expire_jobs
+
+
+def register_commands(app):
+    """Add the maintenance commands to the app's `flask` CLI.
+
+    Commands run in their own process, so their writes cannot signal a
+    running server. Servers on SQLite notice them through the shared
+    jobs_version counters on their next request or scrape; on other
+    databases their caches catch up after RESPONSE_CACHE_TTL,
+    STATS_CACHE_TTL and SCRAPE_SEEN_MAX_AGE, or on restart.
+    """
+    app.cli.add_command(compact_jobs)
+    app.cli.add_command(expire_jobs_command)
+    app.cli.add_command(run_scheduler)
+
+
+@click.command('compact-jobs')
+@click.option('--threshold', type=float, default=None,
+              help='Similarity at which jobs are merged (default NEAR_DUPLICATE_THRESHOLD).')
+@click.option('--batch-size', type=int, default=1000, show_default=True, help='Jobs read per batch.')
+@click.option('--dry-run', is_flag=True, help='Report near-duplicates without changing anything.')
+@with_appcontext
+def compact_jobs(threshold, batch_size, dry_run):
+    """Rebuild the near-duplicate index and merge existing near-duplicate jobs."""
+    init_db(current_app)
+    threshold = threshold or current_app.config.get('NEAR_DUPLICATE_THRESHOLD') or DEFAULT_THRESHOLD
+    result = compact_near_duplicates(threshold, batch_size, dry_run)
+    click.echo(f"Scanned {result['scanned']} jobs, "
+               f"{'found' if dry_run else 'merged'} {result['duplicates']} near-duplicates")
+
+
+@click.command('expire-jobs')
+@click.option('--max-age-days', type=float, default=None,
+              help='Age past which jobs expire (default RETENTION_MAX_AGE_DAYS).')
+@click.option('--mode', type=click.Choice(RETENTION_MODES), default=None,
+              help='Delete expired jobs or move them to monthly archive tables (default RETENTION_MODE).')
+@click.option('--all', 'include_manual', is_flag=True, help='Expire manually added jobs too.')
+@click.option('--dry-run', is_flag=True, help='Count expired jobs without changing anything.')
+@with_appcontext
+def expire_jobs_command(max_age_days, mode, include_manual, dry_run):
+    """Delete or archive jobs older than the retention period."""
+    config = current_app.config
+    max_age_days = max_age_days or config.get('RETENTION_MAX_AGE_DAYS')
+    if not max_age_days:
+        raise click.UsageError('Set --max-age-days or RETENTION_MAX_AGE_DAYS')
+    init_db(current_app)
+    result = expire_jobs(timedelta(days=max_age_days),
+                         mode=mode or config.get('RETENTION_MODE', 'archive'),
+                         scraped_only=config.get('RETENTION_SCRAPED_ONLY', True) and not include_manual,
+                         batch_size=config.get('RETENTION_BATCH_SIZE', 500),
+                         dry_run=dry_run)
+    click.echo(f"{'Found' if dry_run else 'Expired'} {result['expired']} jobs posted before {result['cutoff']}"
+               + (f" into {', '.join(result['archive_tables'])}" if result['archive_tables'] else ''))
+
+
+@click.command('run-scheduler')
+@with_appcontext
+def run_scheduler():
+    """Run the scheduled scrapes and the retention policy in the foreground."""
+    app = current_app._get_current_object()
+    init_db(app)
+    scheduler = app.extensions['scrape_scheduler']
+    if not scheduler.scrapes and not scheduler.retention_enabled:
+        raise click.UsageError('Nothing to schedule: set SCRAPE_SCHEDULE or RETENTION_MAX_AGE_DAYS')
+    scheduler.start()
+    click.echo(f"Running {len(scheduler.scrapes)} scheduled scrapes"
+               f"{', retention every ' + str(scheduler.retention_interval) + 's' if scheduler.retention_enabled else ''}"
+               f", press CTRL+C to quit")
+    try:
+        while scheduler.running:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        scheduler.stop()
+        app.extensions['scrape_queue'].shutdown(wait=True)
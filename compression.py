@@ -0,0 +1,87 @@
+import gzip
+import zlib
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Response types worth compressing
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/x-ndjson', 'text/plain', 'text/csv')
+
+
+def _available(algorithm):
+    return algorithm == 'gzip' or algorithm == 'br' and brotli is not None
+
+
+def _choose_encoding(algorithms):
+    """Pick the first configured algorithm the client accepts"""
+    for algorithm in algorithms:
+        if _available(algorithm) and request.accept_encodings[algorithm]:
+            return algorithm
+    return None
+
+
+def _compress(body, algorithm, config):
+    if algorithm == 'br':
+        return brotli.compress(body, quality=config.get('COMPRESS_BROTLI_QUALITY', 4))
+    return gzip.compress(body, compresslevel=config.get('COMPRESS_GZIP_LEVEL', 6), mtime=0)
+
+
+def _compress_stream(chunks, algorithm, config):
+    """Compress a streamed body chunk by chunk, flushing after each chunk"""
+    if algorithm == 'br':
+        compressor = brotli.Compressor(quality=config.get('COMPRESS_BROTLI_QUALITY', 4))
+        compress = lambda chunk: compressor.process(chunk) + compressor.flush()
+        finish = compressor.finish
+    else:
+        compressor = zlib.compressobj(config.get('COMPRESS_GZIP_LEVEL', 6), zlib.DEFLATED, 31)
+        compress = lambda chunk: compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        finish = compressor.flush
+
+    try:
+        for chunk in chunks:
+            data = compress(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+            if data:
+                yield data
+        yield finish()
+    finally:
+        # Let the wrapped body release its request context
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def compress_response(response):
+    """Compress large JSON responses with brotli or gzip when the client accepts it.
+
+    Buffered bodies smaller than COMPRESS_MIN_SIZE bytes are sent as-is;
+    streamed bodies are always compressed. A strong ETag is made weak, as
+    the compressed bytes differ from the ones it was computed over.
+    """
+    config = current_app.config
+    algorithms = config.get('COMPRESS_ALGORITHMS', ('br', 'gzip'))
+    if (not algorithms or response.status_code != 200
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    if not response.is_streamed and response.content_length is not None \
+            and response.content_length < config.get('COMPRESS_MIN_SIZE', 1024):
+        return response
+    algorithm = _choose_encoding(algorithms)
+    if algorithm is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, algorithm, config)
+    else:
+        response.set_data(_compress(response.get_data(), algorithm, config))
+
+    response.headers['Content-Encoding'] = algorithm
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
@@ -1,8 +1,185 @@
+import os
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.schema import CreateIndex
+
+# Bind key of the optional read-only engine used by read requests
+READ_BIND_KEY = 'read'
+
+
+class RoutingSession(Session):
+    """Session that runs queries on the read bind while use_read_bind() is in effect.
+
+    Only tables on the default bind are rerouted, and only when a read bind
+    is configured; everything else resolves as usual.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is None and self.info.get('read_only'):
+            engines = self._db.engines
+            if engine is engines.get(None) and READ_BIND_KEY in engines:
+                return engines[READ_BIND_KEY]
+        return engine
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+# Pragmas applied to every new SQLite connection, overridable per app with
+# the SQLITE_PRAGMAS config dict. WAL lets readers run alongside a writer.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+
+def _is_memory_sqlite(url):
+    return url.get_backend_name() == 'sqlite' and (
+        url.database in (None, '', ':memory:') or url.query.get('mode') == 'memory'
+    )
+
+
+def engine_options(config):
+    """Build SQLALCHEMY_ENGINE_OPTIONS (pool sizing and pre-ping) for the configured database"""
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    options = {'pool_pre_ping': True}
+    if _is_memory_sqlite(url):
+        # In-memory databases share a single static connection
+        return options
+
+    options['pool_size'] = config.get('DB_POOL_SIZE', 10)
+    options['max_overflow'] = config.get('DB_MAX_OVERFLOW', 20)
+    options['pool_timeout'] = config.get('DB_POOL_TIMEOUT', 30)
+    if url.get_backend_name() != 'sqlite':
+        # Server databases drop idle connections; recycle before they do
+        options['pool_recycle'] = config.get('DB_POOL_RECYCLE', 1800)
+    return options
+
+
+def read_bind(config, read_uri):
+    """Build the SQLALCHEMY_BINDS entry of the read-only engine, or None.
+
+    read_uri is a database URL (e.g. a replica), or 'readonly' for a set of
+    mode=ro connections to the primary SQLite file.
+    """
+    if not read_uri:
+        return None
+    if read_uri == 'readonly':
+        url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+        if url.get_backend_name() != 'sqlite' or _is_memory_sqlite(url):
+            raise ValueError("A 'readonly' read bind needs a file-based SQLite primary database")
+        read_uri = f'sqlite:///file:{os.path.abspath(url.database)}?mode=ro&uri=true'
+    return {'url': read_uri, **engine_options({**config, 'SQLALCHEMY_DATABASE_URI': read_uri})}
+
+
+def use_read_bind(enabled=True):
+    """Route the current session's queries to the read bind, if configured, or back to the primary"""
+    db.session.info['read_only'] = enabled
+
+
+def configure_engines(app):
+    """Register the per-connection pragma hook on every engine of the app"""
+    pragmas = {**SQLITE_PRAGMAS, **app.config.get('SQLITE_PRAGMAS', {})}
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        configure_engine(engine, pragmas)
+
+
+def configure_engine(engine, pragmas):
+    """Apply SQLite pragmas to every new connection of a (sync) engine"""
+    if engine.dialect.name != 'sqlite':
+        return
+    if engine.url.query.get('mode') == 'ro':
+        # Read-only connections cannot change the journal mode
+        pragmas = {k: v for k, v in pragmas.items() if k != 'journal_mode'}
+    event.listen(engine, 'connect', _sqlite_pragma_hook(pragmas))
+
+
+def _sqlite_pragma_hook(pragmas):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                if value is not None:
+                    cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+    return set_pragmas
 
-db = SQLAlchemy()
 
 def init_db(app):
     """Initialize database with app context"""
     with app.app_context():
-        db.create_all()
\ No newline at end of file
+        db.create_all()
+        added = add_missing_columns()
+        
+        from ingest import backfill_dedup_keys, backfill_salary_ranges
+        backfill_dedup_keys()
+        if 'jobs.salary_min' in added:
+            backfill_salary_ranges()
+        
+        create_missing_indexes()
+        drop_obsolete_indexes()
+        
+        from search import init_search
+        init_search(db.engine)
+        
+        from stats import init_stats
+        init_stats(db.engine)
+        
+        from near_duplicates import init_near_duplicates
+        init_near_duplicates(db.engine)
+        
+        from table_version import init_table_version
+        init_table_version(db.engine)
+
+def add_missing_columns():
+    """Add columns added to models after their table already existed.
+
+    Returns the added columns as 'table.column' names.
+    """
+    added = []
+    inspector = db.inspect(db.engine)
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            existing = {c['name'] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=db.engine.dialect)
+                    conn.execute(db.text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                    added.append(f'{table.name}.{column.name}')
+    return added
+
+# Indexes of earlier schemas superseded by the composite indexes on Job
+OBSOLETE_INDEXES = (
+    'ix_jobs_job_type',
+    'ix_jobs_experience_level',
+    'ix_jobs_scraped',
+    'ix_jobs_company_normalized',
+    'ix_jobs_location_normalized',
+    'ix_jobs_job_type_normalized',
+    'ix_jobs_experience_level_normalized',
+)
+
+def create_missing_indexes():
+    """Create indexes added to models after their table already existed"""
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+
+def drop_obsolete_indexes():
+    """Drop indexes of earlier schemas that no query uses any more"""
+    with db.engine.begin() as conn:
+        for name in OBSOLETE_INDEXES:
+            conn.execute(db.text(f'DROP INDEX IF EXISTS {name}'))
+        if db.engine.dialect.name == 'sqlite':
+            # Refresh planner statistics where the schema or data changed enough
+            conn.execute(db.text('PRAGMA optimize'))
@@ -0,0 +1,172 @@
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class DriverPoolTimeout(Exception):
+    """Raised when no driver becomes available in time"""
+
+
+class PooledDriver:
+    """A pooled WebDriver and its usage count"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+
+
+def _default_factory(headless):
+    """Start a Chrome driver using the scraper's configuration"""
+    from selenium_scraper import create_driver
+    return create_driver(headless)
+
+
+class DriverPool:
+    """Keeps up to size warm Chrome drivers and leases them to scrapers.
+
+    Between leases a driver's cookies and storage are cleared and it gets a
+    new user agent. Drivers are recycled after max_uses leases, or as soon
+    as they fail a health check or a lease ends with an exception.
+    """
+
+    def __init__(self, app=None, size=2, max_uses=50, headless=True, factory=None):
+        self.size = size
+        self.max_uses = max_uses
+        self.headless = headless
+        self.factory = factory or _default_factory
+        self._idle = []
+        self._leased = 0
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._closed = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register the pool on the app, sized from the DRIVER_POOL_* settings"""
+        self.size = app.config.get('DRIVER_POOL_SIZE', self.size)
+        self.max_uses = app.config.get('DRIVER_POOL_MAX_USES', self.max_uses)
+        self._slots = threading.BoundedSemaphore(self.size)
+        app.extensions['driver_pool'] = self
+        atexit.register(self.shutdown)
+        if app.config.get('DRIVER_POOL_PREWARM'):
+            threading.Thread(target=self.warm_up, name='driver-pool-warmup', daemon=True).start()
+
+    def warm_up(self):
+        """Start drivers until idle and leased drivers fill the pool.
+
+        Each driver is started holding a lease slot, so warm-up never adds
+        to a pool whose slots are all leased and the pool never holds more
+        than size drivers.
+        """
+        while not self._closed:
+            if not self._slots.acquire(blocking=False):
+                return
+            try:
+                with self._lock:
+                    if len(self._idle) + self._leased >= self.size:
+                        return
+                try:
+                    pooled = self._create()
+                except Exception as e:
+                    logger.warning(f"Failed to warm up driver pool: {e}")
+                    return
+                with self._lock:
+                    self._idle.append(pooled)
+            finally:
+                self._slots.release()
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """Borrow a driver for the duration of a with block"""
+        if self._closed:
+            raise RuntimeError('Driver pool is shut down')
+        if not self._slots.acquire(timeout=timeout if timeout is not None else -1):
+            raise DriverPoolTimeout('Timed out waiting for a browser')
+
+        with self._lock:
+            self._leased += 1
+        pooled = None
+        try:
+            pooled = self._checkout()
+            pooled.uses += 1
+            yield pooled.driver
+        except BaseException:
+            if pooled is not None:
+                self._discard(pooled, reason='lease failed')
+                pooled = None
+            raise
+        finally:
+            if pooled is not None:
+                self._checkin(pooled)
+            with self._lock:
+                self._leased -= 1
+            self._slots.release()
+
+    def shutdown(self):
+        """Quit all idle drivers and refuse new leases"""
+        self._closed = True
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            self._quit(pooled)
+        if idle:
+            logger.info(f"Driver pool shut down ({len(idle)} browsers closed)")
+
+    def _create(self):
+        return PooledDriver(self.factory(self.headless))
+
+    def _checkout(self):
+        """Take a healthy idle driver or start a new one"""
+        while True:
+            with self._lock:
+                pooled = self._idle.pop() if self._idle else None
+            if pooled is None:
+                return self._create()
+            if self._is_alive(pooled):
+                return pooled
+            self._discard(pooled, reason='failed health check')
+
+    def _checkin(self, pooled):
+        """Reset a driver and return it to the pool, or recycle it"""
+        if self._closed or pooled.uses >= self.max_uses:
+            self._discard(pooled, reason=f'recycled after {pooled.uses} uses')
+            return
+        try:
+            self._reset(pooled.driver)
+        except Exception as e:
+            self._discard(pooled, reason=f'reset failed: {e}')
+            return
+        with self._lock:
+            self._idle.append(pooled)
+
+    def _reset(self, driver):
+        """Clear per-session browser state and rotate the user agent"""
+        from selenium_scraper import random_user_agent
+
+        driver.delete_all_cookies()
+        driver.execute_script(
+            "try { window.localStorage.clear(); window.sessionStorage.clear(); } catch (e) {}"
+        )
+        driver.get('about:blank')
+        driver.execute_cdp_cmd('Network.setUserAgentOverride', {'userAgent': random_user_agent()})
+
+    def _is_alive(self, pooled):
+        try:
+            pooled.driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, pooled, reason):
+        logger.info(f"Discarding pooled driver: {reason}")
+        self._quit(pooled)
+
+    def _quit(self, pooled):
+        try:
+            pooled.driver.quit()
+        except Exception as e:
+            logger.warning(f"Error closing driver: {e}")
@@ -0,0 +1,207 @@
+import re
+from collections import namedtuple
+
+# Title keywords of each experience level, in order of precedence
+EXPERIENCE_LEVELS = (
+    ('Senior', ('senior', 'sr.', 'lead', 'principal', 'staff', 'architect')),
+    ('Mid', ('mid', 'intermediate', 'software engineer ii', 'software engineer 2')),
+    ('Entry', ('junior', 'jr.', 'entry', 'intern', 'internship')),
+)
+
+# Level of titles matching none of the level keywords
+DEFAULT_EXPERIENCE_LEVEL = 'Mid'
+
+# Description of scraped jobs, whose search result cards carry none
+PLACEHOLDER_DESCRIPTION = "Click the application URL to view the full job description on LinkedIn."
+
+# Title keywords of internships and temporary positions
+TEMPORARY_TERMS = ('intern', 'internship', 'temporary', 'contract')
+
+# Title keywords of the technologies ranked first
+TECH_KEYWORDS = ('python', 'javascript', 'react', 'node', 'aws', 'cloud', 'full stack', 'fullstack')
+
+# Priority score contributions, see enrich_jobs()
+LEVEL_SCORES = {'Senior': 5, 'Mid': 3, 'Entry': -2}
+TEMPORARY_SCORE = -3
+TECH_SCORE = 2
+REMOTE_SCORE = 2
+
+
+class KeywordMatcher:
+    """Finds which of a set of keywords occur as substrings of a text.
+
+    All keywords are compiled into one regex tried at every position of
+    the text, longest keyword first, so one scan finds every occurrence.
+    Matches are returned as a bitmask with one bit per keyword; keywords
+    that are prefixes of the keyword found at a position occur there too
+    and their bits are added from a precomputed table.
+    """
+
+    def __init__(self, keywords):
+        keywords = sorted(set(keywords), key=len, reverse=True)
+        self.bits = {k: 1 << i for i, k in enumerate(keywords)}
+        self._masks = {k: self.mask_of(p for p in keywords if k.startswith(p)) for k in keywords}
+        alternatives = '|'.join(re.escape(k) for k in keywords)
+        self._findall = re.compile(f'(?=({alternatives}))').findall
+
+    def mask_of(self, keywords):
+        """The bitmask of the given keywords"""
+        mask = 0
+        for keyword in keywords:
+            mask |= self.bits[keyword]
+        return mask
+
+    def match(self, text):
+        """The bitmask of the keywords occurring in text"""
+        mask = 0
+        for keyword in self._findall(text):
+            mask |= self._masks[keyword]
+        return mask
+
+
+_TITLE_MATCHER = KeywordMatcher(
+    [term for _, terms in EXPERIENCE_LEVELS for term in terms] + list(TEMPORARY_TERMS) + list(TECH_KEYWORDS)
+)
+_LEVEL_MASKS = [(level, _TITLE_MATCHER.mask_of(terms)) for level, terms in EXPERIENCE_LEVELS]
+_TEMPORARY_MASK = _TITLE_MATCHER.mask_of(TEMPORARY_TERMS)
+_TECH_MASK = _TITLE_MATCHER.mask_of(TECH_KEYWORDS)
+
+TitleFeatures = namedtuple('TitleFeatures', 'level temporary tech_count')
+
+
+def title_features(titles):
+    """Matched experience level (or None), temporary flag and technology count of each title"""
+    features = []
+    match = _TITLE_MATCHER.match
+    for title in titles:
+        mask = match((title or '').lower())
+        level = next((level for level, level_mask in _LEVEL_MASKS if mask & level_mask), None)
+        features.append(TitleFeatures(level, bool(mask & _TEMPORARY_MASK), bin(mask & _TECH_MASK).count('1')))
+    return features
+
+
+def experience_level(title):
+    """Experience level of a job title"""
+    return title_features([title])[0].level or DEFAULT_EXPERIENCE_LEVEL
+
+
+def _priority(features, location):
+    score = LEVEL_SCORES.get(features.level, 0)
+    if features.temporary:
+        score += TEMPORARY_SCORE
+    score += TECH_SCORE * features.tech_count
+    if 'remote' in (location or '').lower():
+        score += REMOTE_SCORE
+    return score
+
+
+def enrich_jobs(jobs):
+    """Derive the experience level and priority score of a batch of scraped jobs.
+
+    Sets 'priority' on every job dict, and 'experience_level' on those
+    without one, from a single keyword scan of each title. Returns jobs.
+    """
+    for job, features in zip(jobs, title_features([job.get('title') for job in jobs])):
+        job.setdefault('experience_level', features.level or DEFAULT_EXPERIENCE_LEVEL)
+        job['priority'] = _priority(features, job.get('location'))
+    return jobs
+
+
+# Salary parsing
+
+SalaryRange = namedtuple('SalaryRange', 'min max currency')
+
+# Currency symbols, longest first so 'CA$' is not read as '$'
+CURRENCY_SYMBOLS = (
+    ('US$', 'USD'), ('CA$', 'CAD'), ('C$', 'CAD'), ('AU$', 'AUD'), ('A$', 'AUD'),
+    ('$', 'USD'), ('€', 'EUR'), ('£', 'GBP'), ('₹', 'INR'), ('¥', 'JPY'),
+)
+CURRENCY_CODES = ('USD', 'EUR', 'GBP', 'CAD', 'AUD', 'NZD', 'CHF', 'SEK', 'NOK', 'DKK',
+                  'PLN', 'INR', 'JPY', 'SGD')
+
+# Amounts are stored per year; multipliers of the pay periods salaries are quoted in
+PAY_PERIODS = (
+    (re.compile(r'/\s*h(?:ou)?r\b|\bper hour\b|\ban hour\b|\bhourly\b|/\s*h\b'), 2080),
+    (re.compile(r'/\s*day\b|\bper day\b|\ba day\b|\bdaily\b'), 260),
+    (re.compile(r'/\s*w(?:ee)?k\b|\bper week\b|\ba week\b|\bweekly\b'), 52),
+    (re.compile(r'/\s*mo(?:nth)?\b|\bper month\b|\ba month\b|\bmonthly\b'), 12),
+)
+
+_CODE_RE = re.compile(r'(?<![a-z])(' + '|'.join(CURRENCY_CODES) + r')(?![a-z])', re.IGNORECASE)
+_AMOUNT = r'(?<![\d.,])(\d[\d,.]*)(?!\d)\s*([km])?(?![a-z])'
+# An amount, optionally followed by the upper bound of a range ('$120k/yr - $150k/yr')
+_SALARY_RE = re.compile(_AMOUNT + r'(?:\s*[^\d\s]{0,4}\s*(?:-|–|—|to)\s*[^\d\s]{0,4}\s*' + _AMOUNT + ')?',
+                        re.IGNORECASE)
+_SUFFIXES = {'k': 1000, 'm': 1000000}
+_THOUSANDS_RE = re.compile(r'\d[,.]\d{3}(?!\d)')
+
+
+def _parse_number(text):
+    text = text.rstrip('.,')
+    # The last separator is a decimal point unless it repeats or groups three digits
+    last = max(text.rfind(','), text.rfind('.'))
+    fraction = '0'
+    if last >= 0 and text.count(text[last]) == 1 and len(text) - last - 1 != 3:
+        text, fraction = text[:last], text[last + 1:]
+    return float(re.sub(r'[,.]', '', text) + '.' + fraction)
+
+
+def _currency(text):
+    code = _CODE_RE.search(text)
+    if code:
+        return code.group(1).upper()
+    for symbol, currency in CURRENCY_SYMBOLS:
+        if symbol in text:
+            return currency
+    return None
+
+
+def parse_salary(text):
+    """Parse a free-text salary into a SalaryRange of yearly amounts, or None.
+
+    Understands single amounts and ranges with thousands separators, k/m
+    suffixes ('$120k - 150k', '€50.000') and hourly, daily, weekly or
+    monthly rates, which are converted to yearly amounts. The currency is
+    an ISO 4217 code, or None when the text names none. The minimum is
+    never above the maximum.
+
+    >>> parse_salary('$120-150k')
+    SalaryRange(min=120000, max=150000, currency='USD')
+    >>> parse_salary('$50 - 60k')
+    SalaryRange(min=50000, max=60000, currency='USD')
+    >>> parse_salary('$50,000 - 60k')
+    SalaryRange(min=50000, max=60000, currency='USD')
+    >>> parse_salary('€50.000 - 65k a year')
+    SalaryRange(min=50000, max=65000, currency='EUR')
+    >>> parse_salary('$1.5-2m')
+    SalaryRange(min=1500000, max=2000000, currency='USD')
+    >>> parse_salary('$40 - $55/hr')
+    SalaryRange(min=83200, max=114400, currency='USD')
+    """
+    match = _SALARY_RE.search(text) if text else None
+    if match is None:
+        return None
+    low, low_suffix, high, high_suffix = match.groups()
+    try:
+        values = [_parse_number(low)] + ([_parse_number(high)] if high else [])
+    except ValueError:
+        return None
+    # '$120-150k': a suffix on the upper bound of a range also applies to a
+    # lower bound below it without thousands separators, not to '$50,000 - 60k'
+    suffixes = [low_suffix, high_suffix]
+    if high and not low_suffix and not _THOUSANDS_RE.search(low) and values[0] < values[1]:
+        suffixes[0] = high_suffix
+    values = [value * _SUFFIXES.get((suffix or '').lower(), 1) for value, suffix in zip(values, suffixes)]
+
+    lowered = text.lower()
+    per_year = next((m for pattern, m in PAY_PERIODS if pattern.search(lowered)), 1)
+    low, high = min(values) * per_year, max(values) * per_year
+    return SalaryRange(round(low), round(high), _currency(text))
+
+
+def salary_columns(text):
+    """The salary_min, salary_max and salary_currency column values of a salary text"""
+    salary = parse_salary(text)
+    if salary is None:
+        return {'salary_min': None, 'salary_max': None, 'salary_currency': None}
+    return {'salary_min': salary.min, 'salary_max': salary.max, 'salary_currency': salary.currency}
@@ -0,0 +1,167 @@
+import logging
+import threading
+from contextlib import ExitStack
+from urllib.parse import urljoin, urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from lxml import html as lxml_html
+from lxml.cssselect import CSSSelector
+from selenium_scraper import (JobScraper, CARD_SELECTORS, CARD_FIELD_SELECTORS,
+                              CARD_FIELD_ATTRIBUTES, create_driver, random_user_agent, is_blocked_url)
+
+logger = logging.getLogger(__name__)
+
+# Markers of a results page that legitimately has no job cards
+EMPTY_RESULTS_SELECTORS = ['.jobs-search__results-list', '.jobs-search-no-results']
+
+# Statuses LinkedIn answers with when it throttles or blocks a client
+BLOCKED_STATUS_CODES = (403, 429, 999)
+
+_card_selectors = [CSSSelector(s) for s in CARD_SELECTORS]
+_empty_selectors = [CSSSelector(s) for s in EMPTY_RESULTS_SELECTORS]
+_field_selectors = {
+    field: [CSSSelector(s) for s in selectors]
+    for field, selectors in CARD_FIELD_SELECTORS.items()
+}
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class HttpScrapeError(Exception):
+    """Raised when a page cannot be scraped over plain HTTP"""
+
+
+def get_session(pool_size=10):
+    """Shared keep-alive HTTP session used by every HttpJobScraper"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=1)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
+
+def parse_job_cards(page_html, base_url, limit=None):
+    """Read job card fields from a search results page.
+
+    Returns a list of raw field dicts, or None when the page has neither job
+    cards nor an empty results list (for example a login wall).
+    """
+    doc = lxml_html.fromstring(page_html)
+
+    cards = []
+    for selector in _card_selectors:
+        cards = selector(doc)
+        if cards:
+            break
+    if not cards:
+        return [] if any(selector(doc) for selector in _empty_selectors) else None
+
+    raw_jobs = []
+    for card in cards[:limit]:
+        data = {}
+        for field, selectors in _field_selectors.items():
+            data[field] = ''
+            attribute = CARD_FIELD_ATTRIBUTES.get(field)
+            for selector in selectors:
+                elements = selector(card)
+                if not elements:
+                    continue
+                if attribute:
+                    value = elements[0].get(attribute) or ''
+                    if attribute == 'href' and value:
+                        value = urljoin(base_url, value)
+                else:
+                    value = elements[0].text_content()
+                data[field] = ' '.join(value.split())
+                if data[field]:
+                    break
+        raw_jobs.append(data)
+    return raw_jobs
+
+
+class HttpJobScraper(JobScraper):
+    """JobScraper that reads public search pages over pooled HTTP connections.
+
+    No browser is started unless a page cannot be fetched or parsed over
+    HTTP, in which case that page is scraped with Selenium instead, using a
+    driver from driver_lease (e.g. DriverPool.lease) or a dedicated one.
+    """
+
+    def __init__(self, rate_limiter=None, driver_lease=None, selenium_fallback=True,
+                 session=None, timeout=15, base_url=None, timer=None, seen=None):
+        super().__init__(headless=True, rate_limiter=rate_limiter, card_delay=0, timer=timer, seen=seen)
+        self.driver_lease = driver_lease
+        self.selenium_fallback = selenium_fallback
+        self.session = session or get_session()
+        self.timeout = timeout
+        if base_url:
+            self.base_url = base_url.rstrip('/')
+
+    def setup_driver(self):
+        """Browsers are only started on demand for Selenium fallback"""
+
+    def scrape_linkedin_page(self, search_term="software engineer", location="", page=0, limit=5):
+        """Scrape one results page over HTTP, falling back to Selenium"""
+        try:
+            return self._scrape_page_http(search_term, location, page, limit)
+        except HttpScrapeError as e:
+            if not self.selenium_fallback:
+                raise
+            logger.warning(f"HTTP scraping failed, falling back to Selenium: {e}")
+            return self._scrape_page_selenium(search_term, location, page, limit)
+
+    def _scrape_page_http(self, search_term, location, page, limit):
+        url = self.build_search_url(search_term, location, page)
+        host = urlsplit(url).netloc
+        if self.rate_limiter:
+            with self.timer.stage('rate_limit'):
+                self.rate_limiter.wait(host)
+
+        logger.info(f"Fetching LinkedIn Jobs: {url}")
+        try:
+            with self.timer.stage('http_fetch'):
+                response = self.session.get(url, timeout=self.timeout, headers={
+                    'User-Agent': random_user_agent(),
+                    'Accept': 'text/html,application/xhtml+xml',
+                    'Accept-Language': 'en-US,en;q=0.9'
+                })
+        except requests.RequestException as e:
+            self.timer.page('error')
+            raise HttpScrapeError(f"Request failed: {e}")
+        if response.status_code in BLOCKED_STATUS_CODES or is_blocked_url(response.url):
+            self._record_page(host, 'blocked')
+            raise HttpScrapeError(f"Blocked with HTTP status {response.status_code} at {response.url}")
+        if response.status_code != 200:
+            self.timer.page('error')
+            raise HttpScrapeError(f"Unexpected HTTP status {response.status_code}")
+
+        with self.timer.stage('http_parse'):
+            raw_jobs = parse_job_cards(response.text, response.url, limit)
+            if raw_jobs is not None:
+                jobs = self._build_jobs(raw_jobs)
+        if raw_jobs is None:
+            self._record_page(host, 'blocked')
+            raise HttpScrapeError("No job results in page")
+        self._record_page(host, 'ok' if jobs else 'empty')
+        return jobs
+
+    def _scrape_page_selenium(self, search_term, location, page, limit):
+        scrape_page = super().scrape_linkedin_page
+        if self.driver_lease is not None:
+            with ExitStack() as stack:
+                with self.timer.stage('driver_lease'):
+                    self.driver = stack.enter_context(self.driver_lease())
+                try:
+                    return scrape_page(search_term, location, page, limit)
+                finally:
+                    self.driver = None
+
+        if self.driver is None:
+            with self.timer.stage('driver_start'):
+                self.driver = create_driver(self.headless)
+        return scrape_page(search_term, location, page, limit)
@@ -0,0 +1,190 @@
+import logging
+from collections import namedtuple
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from database import db
+from models import Job, make_dedup_key
+from enrichment import salary_columns
+from near_duplicates import find_near_duplicates, index_jobs
+
+logger = logging.getLogger(__name__)
+
+# Keys per IN (...) lookup, well below SQLite's bound parameter limit
+LOOKUP_CHUNK_SIZE = 500
+
+IngestResult = namedtuple('IngestResult', 'added near_duplicates')
+
+
+def build_job_row(job_data, scraped=True, posted_date=None):
+    """Build an insertable row from job data, filling in defaults"""
+    row = {
+        'title': job_data['title'],
+        'company': job_data['company'],
+        'location': job_data.get('location') or 'Not specified',
+        'description': job_data.get('description', ''),
+        'salary': job_data.get('salary', ''),
+        'job_type': job_data.get('job_type', 'Full-time'),
+        'experience_level': job_data.get('experience_level', 'Not specified'),
+        'application_url': job_data.get('application_url', ''),
+        'scraped': scraped,
+        'posted_date': posted_date or datetime.utcnow()
+    }
+    row['dedup_key'] = make_dedup_key(row['title'], row['company'], row['location'])
+    # Bulk inserts bypass the model events that derive these
+    row.update(salary_columns(row['salary']))
+    return row
+
+
+def find_existing_keys(keys):
+    """Return the subset of dedup keys already stored, in chunked IN lookups"""
+    keys = list(keys)
+    existing = set()
+    for start in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+        chunk = keys[start:start + LOOKUP_CHUNK_SIZE]
+        existing.update(
+            key for (key,) in db.session.query(Job.dedup_key).filter(Job.dedup_key.in_(chunk))
+        )
+    return existing
+
+
+def _insert_statement():
+    """INSERT that ignores dedup key conflicts, or None where the dialect cannot"""
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        return None
+    return insert(Job).on_conflict_do_nothing(index_elements=['dedup_key'])
+
+
+def insert_new_rows(rows):
+    """Insert job rows, skipping those whose dedup key is already stored.
+
+    Returns the ids of the inserted rows by dedup key. Dialects without
+    INSERT ... ON CONFLICT (e.g. MySQL) insert row by row, each in a
+    savepoint so a conflicting row is skipped without losing the others.
+    """
+    statement = _insert_statement()
+    if statement is not None:
+        return dict(db.session.execute(statement.returning(Job.dedup_key, Job.id), rows).all())
+
+    ids = {}
+    for row in rows:
+        try:
+            with db.session.begin_nested():
+                result = db.session.execute(db.insert(Job).values(**row))
+        except IntegrityError:
+            continue
+        ids[row['dedup_key']] = result.inserted_primary_key[0]
+    return ids
+
+
+def upsert_scraped_jobs(scraped_jobs, near_duplicate_threshold=None):
+    """Insert scraped jobs that are not already stored, in one batch.
+
+    Duplicates are resolved by dedup key, both against the table and within
+    the batch itself. With near_duplicate_threshold, jobs at least that
+    similar to a stored or earlier job (see near_duplicates) are skipped
+    too. New jobs are added to the near-duplicate index. Returns an
+    IngestResult of the number of jobs added and of near-duplicates
+    skipped. The caller commits.
+    """
+    rows = {}
+    for job_data in scraped_jobs:
+        try:
+            row = build_job_row(job_data)
+        except (KeyError, TypeError) as e:
+            logger.error(f"Error processing job: {e}")
+            continue
+        if not (row['title'] and row['company']):
+            continue
+        rows.setdefault(row['dedup_key'], row)
+
+    if not rows:
+        return IngestResult(0, 0)
+
+    existing = find_existing_keys(rows)
+    new_rows = [row for key, row in rows.items() if key not in existing]
+    near_duplicates = 0
+    keys = None
+    if new_rows and near_duplicate_threshold:
+        matches, keys = find_near_duplicates(new_rows, near_duplicate_threshold)
+        kept = [(row, row_keys) for row, row_keys, match in zip(new_rows, keys, matches) if match is None]
+        near_duplicates = len(new_rows) - len(kept)
+        new_rows = [row for row, _ in kept]
+        keys = [row_keys for _, row_keys in kept]
+
+    added = 0
+    if new_rows:
+        ids = insert_new_rows(new_rows)
+        added = len(ids)
+        # Rows lost to a concurrent insert of the same listing are not indexed
+        inserted = [(i, {**row, 'id': ids[row['dedup_key']]})
+                    for i, row in enumerate(new_rows) if row['dedup_key'] in ids]
+        index_jobs([row for _, row in inserted], keys and [keys[i] for i, _ in inserted])
+
+    logger.info(f"Ingested {added} new of {len(rows)} unique scraped jobs"
+                f" ({near_duplicates} near-duplicates skipped)")
+    return IngestResult(added, near_duplicates)
+
+
+def backfill_dedup_keys(batch_size=1000):
+    """Compute dedup keys for rows stored before the column existed.
+
+    Rows that duplicate an earlier listing keep a NULL key so the unique
+    index can still be created.
+    """
+    missing = db.session.query(Job.id).filter(Job.dedup_key.is_(None)).first()
+    if missing is None:
+        return 0
+
+    seen = {key for (key,) in db.session.query(Job.dedup_key).filter(Job.dedup_key.isnot(None))}
+    updated = 0
+    duplicates = 0
+    last_id = 0
+    while True:
+        batch = db.session.query(Job.id, Job.title, Job.company, Job.location).filter(
+            Job.dedup_key.is_(None), Job.id > last_id
+        ).order_by(Job.id).limit(batch_size).all()
+        if not batch:
+            break
+        updates = []
+        for job_id, title, company, location in batch:
+            key = make_dedup_key(title, company, location)
+            if key in seen:
+                duplicates += 1
+                continue
+            seen.add(key)
+            updates.append({'id': job_id, 'dedup_key': key})
+        if updates:
+            db.session.execute(db.update(Job), updates)
+            updated += len(updates)
+        last_id = batch[-1].id
+    db.session.commit()
+
+    logger.info(f"Backfilled {updated} dedup keys ({duplicates} duplicate listings left unkeyed)")
+    return updated
+
+
+def backfill_salary_ranges(batch_size=1000):
+    """Parse the salary range of rows stored before the salary columns existed"""
+    updated = 0
+    last_id = 0
+    while True:
+        batch = db.session.query(Job.id, Job.salary).filter(
+            Job.id > last_id, Job.salary.isnot(None), Job.salary != ''
+        ).order_by(Job.id).limit(batch_size).all()
+        if not batch:
+            break
+        updates = [{'id': job_id, **salary_columns(salary)} for job_id, salary in batch]
+        updates = [row for row in updates if row['salary_min'] is not None]
+        if updates:
+            db.session.execute(db.update(Job), updates)
+            updated += len(updates)
+        last_id = batch[-1].id
+    db.session.commit()
+
+    logger.info(f"Backfilled {updated} salary ranges")
+    return updated
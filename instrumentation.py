@@ -0,0 +1,281 @@
+import os
+import sys
+import time
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import g, request, has_request_context, current_app
+from sqlalchemy import event
+from database import db
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+REQUESTS = registry.counter(
+    'http_requests_total', 'API requests handled', ('method', 'endpoint', 'status'))
+REQUEST_DURATION = registry.histogram(
+    'http_request_duration_seconds', 'Wall time of API requests', ('method', 'endpoint'))
+REQUEST_SQL_STATEMENTS = registry.histogram(
+    'http_request_sql_statements', 'SQL statements executed per API request', ('endpoint',),
+    buckets=(0, 1, 2, 5, 10, 25, 50, 100, 250, 1000))
+REQUEST_SQL_SECONDS = registry.counter(
+    'http_request_sql_seconds_total', 'Time API requests spent in SQL statements', ('endpoint',))
+RESPONSE_ROWS = registry.counter(
+    'http_response_rows_total', 'Job rows serialized into API responses', ('endpoint',))
+RESPONSE_BYTES = registry.counter(
+    'http_response_bytes_total', 'Response body bytes sent by the API', ('endpoint',))
+SQL_DURATION = registry.histogram(
+    'sql_statement_duration_seconds', 'Duration of SQL statements, including background work', ('bind',),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0))
+
+
+# Metrics of the request handled by the current task in ASGI mode
+_async_request_metrics = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Measurements of the request being handled"""
+
+    __slots__ = ('started', 'sql_statements', 'sql_seconds', 'rows', 'phases')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+        self.rows = 0
+        self.phases = {}
+
+
+def current_metrics():
+    """The RequestMetrics of the current request, or None outside instrumented requests"""
+    if not has_request_context():
+        return _async_request_metrics.get()
+    return g.get('request_metrics')
+
+
+def record_rows(count):
+    """Count rows serialized into the current response"""
+    metrics = current_metrics()
+    if metrics is not None:
+        metrics.rows += count
+
+
+@contextmanager
+def timed(phase):
+    """Add the time spent in the block to a named Server-Timing phase of the request"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics = current_metrics()
+        if metrics is not None:
+            metrics.phases[phase] = metrics.phases.get(phase, 0.0) + time.perf_counter() - started
+
+
+class SamplingProfiler:
+    """Samples the call stack of one thread at a fixed interval.
+
+    The report is in the collapsed stack format read by flame graph tools:
+    one line per distinct stack, root first, followed by its sample count.
+    """
+
+    def __init__(self, interval=0.002):
+        self.interval = interval
+        self.samples = Counter()
+        self._thread_id = None
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def start(self):
+        """Start sampling the calling thread"""
+        self._thread_id = threading.get_ident()
+        self._sampler = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+        self._sampler.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._sampler.join()
+        return self.samples
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def report(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.samples.most_common())
+
+
+def _server_timing(elapsed, metrics):
+    timings = [f'total;dur={elapsed * 1000:.2f}',
+               f'db;dur={metrics.sql_seconds * 1000:.2f};desc="queries={metrics.sql_statements}"']
+    timings.extend(f'{phase};dur={seconds * 1000:.2f}' for phase, seconds in metrics.phases.items())
+    return ', '.join(timings)
+
+
+def _count_streamed(chunks, endpoint, metrics):
+    """Pass a streamed body through, recording its rows and bytes once it is sent"""
+    rows = metrics.rows
+    sent = 0
+    try:
+        for chunk in chunks:
+            sent += len(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+            yield chunk
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+        # Rows serialized while streaming are recorded on the same metrics
+        if metrics.rows > rows:
+            RESPONSE_ROWS.inc(metrics.rows - rows, endpoint=endpoint)
+        RESPONSE_BYTES.inc(sent, endpoint=endpoint)
+
+
+class RequestInstrumentation:
+    """Per-request timing, SQL statement counting and optional sampling profiles.
+
+    Every request gets a Server-Timing header with its wall time, SQL time
+    and statement count and any timed() phases, and is recorded in the
+    metrics served by /api/metrics. With PROFILING_ENABLED set, a request
+    sent with an X-Profile: 1 header is answered with a sampling profile
+    of its handling instead of its body.
+    """
+
+    def __init__(self, app=None):
+        self.profiling_enabled = False
+        self.profile_interval = 0.002
+        self.sql_statements_warn = 50
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Hook the app's requests and database engines"""
+        self.profiling_enabled = app.config.get('PROFILING_ENABLED', self.profiling_enabled)
+        self.profile_interval = app.config.get('PROFILE_INTERVAL', self.profile_interval)
+        self.sql_statements_warn = app.config.get('SQL_STATEMENTS_WARN', self.sql_statements_warn)
+
+        with app.app_context():
+            engines = dict(db.engines)
+        for bind, engine in engines.items():
+            self.instrument_engine(engine, bind or 'default')
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.extensions['instrumentation'] = self
+
+    @staticmethod
+    def instrument_engine(engine, bind):
+        """Time every SQL statement of a (sync) engine, counting it against the current request"""
+        @event.listens_for(engine, 'before_cursor_execute')
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            context._instrumentation_started = time.perf_counter()
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - context._instrumentation_started
+            SQL_DURATION.observe(elapsed, bind=bind)
+            metrics = current_metrics()
+            if metrics is not None:
+                metrics.sql_statements += 1
+                metrics.sql_seconds += elapsed
+
+    def _before_request(self):
+        g.request_metrics = RequestMetrics()
+        if self.profiling_enabled and request.headers.get('X-Profile', '').lower() in ('1', 'true'):
+            g.request_profiler = SamplingProfiler(self.profile_interval).start()
+
+    def _after_request(self, response):
+        metrics = g.get('request_metrics')
+        if metrics is None:
+            return response
+        profiler = g.pop('request_profiler', None)
+        elapsed = time.perf_counter() - metrics.started
+        endpoint = request.endpoint or 'unmatched'
+
+        REQUESTS.inc(method=request.method, endpoint=endpoint, status=response.status_code)
+        REQUEST_DURATION.observe(elapsed, method=request.method, endpoint=endpoint)
+        REQUEST_SQL_STATEMENTS.observe(metrics.sql_statements, endpoint=endpoint)
+        REQUEST_SQL_SECONDS.inc(metrics.sql_seconds, endpoint=endpoint)
+        if metrics.rows:
+            RESPONSE_ROWS.inc(metrics.rows, endpoint=endpoint)
+
+        if metrics.sql_statements > self.sql_statements_warn:
+            logger.warning(f"{request.method} {request.path} ran {metrics.sql_statements} SQL statements "
+                           f"taking {metrics.sql_seconds * 1000:.1f}ms")
+
+        timings = _server_timing(elapsed, metrics)
+
+        if profiler is not None:
+            profiler.stop()
+            response = current_app.response_class(profiler.report(), mimetype='text/plain')
+            response.headers['X-Profile-Samples'] = str(sum(profiler.samples.values()))
+
+        response.headers['Server-Timing'] = timings
+        if response.is_streamed:
+            response.response = _count_streamed(response.response, endpoint, metrics)
+        else:
+            RESPONSE_BYTES.inc(response.content_length or 0, endpoint=endpoint)
+        return response
+
+
+class AsyncRequestInstrumentation:
+    """ASGI middleware recording what RequestInstrumentation records for Flask.
+
+    Requests get the same metrics and Server-Timing header; SQL statements
+    of engines hooked with RequestInstrumentation.instrument_engine are
+    counted against the request whose task runs them. Rows and bytes are
+    recorded once the last body chunk is sent. Profiling is not supported.
+    """
+
+    def __init__(self, app, sql_statements_warn=50):
+        self.app = app
+        self.sql_statements_warn = sql_statements_warn
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        metrics = RequestMetrics()
+        token = _async_request_metrics.set(metrics)
+        method = scope['method']
+        sent = {'bytes': 0}
+
+        def endpoint():
+            view = scope.get('endpoint')
+            return f'api.{view.__name__}' if view is not None else 'unmatched'
+
+        async def instrumented_send(message):
+            if message['type'] == 'http.response.start':
+                elapsed = time.perf_counter() - metrics.started
+                name = endpoint()
+                REQUESTS.inc(method=method, endpoint=name, status=message['status'])
+                REQUEST_DURATION.observe(elapsed, method=method, endpoint=name)
+                REQUEST_SQL_STATEMENTS.observe(metrics.sql_statements, endpoint=name)
+                REQUEST_SQL_SECONDS.inc(metrics.sql_seconds, endpoint=name)
+                if metrics.sql_statements > self.sql_statements_warn:
+                    logger.warning(f"{method} {scope['path']} ran {metrics.sql_statements} SQL statements "
+                                   f"taking {metrics.sql_seconds * 1000:.1f}ms")
+                message['headers'] = list(message.get('headers', [])) + [
+                    (b'server-timing', _server_timing(elapsed, metrics).encode('latin-1'))]
+            elif message['type'] == 'http.response.body':
+                sent['bytes'] += len(message.get('body', b''))
+                if not message.get('more_body', False):
+                    name = endpoint()
+                    if metrics.rows:
+                        RESPONSE_ROWS.inc(metrics.rows, endpoint=name)
+                    RESPONSE_BYTES.inc(sent['bytes'], endpoint=name)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, instrumented_send)
+        finally:
+            _async_request_metrics.reset(token)
@@ -1,5 +1,19 @@
+import re
+import hashlib
 from datetime import datetime
 from database import db
+from enrichment import salary_columns
+
+_NON_ALNUM_RE = re.compile(r'[\W_]+', re.UNICODE)
+
+def normalize_text(value):
+    """Lowercase and collapse punctuation/whitespace for comparisons"""
+    return _NON_ALNUM_RE.sub(' ', (value or '').lower()).strip()
+
+def make_dedup_key(title, company, location):
+    """Hash of the canonical title, company and location identifying a listing"""
+    canonical = '|'.join(normalize_text(v) for v in (title, company, location))
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
 
 class Job(db.Model):
     """Job model for storing job listings"""
@@ -12,28 +26,122 @@ class Job(db.Model):
     location = db.Column(db.String(200), nullable=False, index=True)
     description = db.Column(db.Text)
     salary = db.Column(db.String(100))
-    job_type = db.Column(db.String(50), index=True)
-    experience_level = db.Column(db.String(50), index=True)
+    # Yearly salary range parsed from salary, for range filters and sorting
+    salary_min = db.Column(db.Integer)
+    salary_max = db.Column(db.Integer)
+    salary_currency = db.Column(db.String(3))
+    job_type = db.Column(db.String(50))
+    experience_level = db.Column(db.String(50))
     posted_date = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     application_url = db.Column(db.String(500))
-    scraped = db.Column(db.Boolean, default=False, index=True)
+    scraped = db.Column(db.Boolean, default=False)
+    dedup_key = db.Column(db.String(40), unique=True, index=True)
+
+    # Case-insensitive exact-match filters followed by the default posted_date
+    # sort; SQLite appends the id tie-breaker to every index implicitly
+    __table_args__ = (
+        db.Index('ix_jobs_company_posted_date', db.func.lower(company), posted_date),
+        db.Index('ix_jobs_location_posted_date', db.func.lower(location), posted_date),
+        db.Index('ix_jobs_job_type_experience_level_posted_date',
+                 db.func.lower(job_type), db.func.lower(experience_level), posted_date),
+        db.Index('ix_jobs_experience_level_posted_date', db.func.lower(experience_level), posted_date),
+        db.Index('ix_jobs_scraped_posted_date', scraped, posted_date),
+        # Salary range filters and sorts, optionally within one currency
+        db.Index('ix_jobs_salary_min', salary_min),
+        db.Index('ix_jobs_salary_max', salary_max),
+        db.Index('ix_jobs_salary_currency_salary_max', db.func.lower(salary_currency), salary_max),
+    )
+
+    # Fields clients may set when creating or updating a job
+    EDITABLE_FIELDS = (
+        'title', 'company', 'location', 'description', 'salary',
+        'job_type', 'experience_level', 'application_url'
+    )
+
+    # Public fields in response order
+    FIELDS = (
+        'id', 'title', 'company', 'location', 'description', 'salary',
+        'salary_min', 'salary_max', 'salary_currency', 'job_type', 'experience_level',
+        'posted_date', 'application_url', 'scraped'
+    )
 
     def to_dict(self):
         """Convert job object to dictionary"""
-        return {
-            'id': self.id,
-            'title': self.title,
-            'company': self.company,
-            'location': self.location,
-            'description': self.description,
-            'salary': self.salary,
-            'job_type': self.job_type,
-            'experience_level': self.experience_level,
-            'posted_date': self.posted_date.isoformat() if self.posted_date else None,
-            'application_url': self.application_url,
-            'scraped': self.scraped
-        }
+        return self.serialize_row(self, self.FIELDS)
+
+    @staticmethod
+    def serialize_row(row, fields):
+        """Convert a job or a selected column row to a dictionary of the given fields"""
+        data = {}
+        for field in fields:
+            value = getattr(row, field)
+            if field == 'posted_date' and value is not None:
+                value = value.isoformat()
+            data[field] = value
+        return data
+    
+    def __repr__(self):
+        """String representation"""
+        return f'<Job {self.title} at {self.company}>'
+
+@db.event.listens_for(Job, 'before_insert')
+def _set_dedup_key(mapper, connection, job):
+    """Compute the dedup key and salary range of a new job"""
+    job.dedup_key = make_dedup_key(job.title, job.company, job.location)
+    _set_salary_columns(job)
+
+@db.event.listens_for(Job, 'before_update')
+def _update_dedup_key(mapper, connection, job):
+    """Recompute the dedup key and salary range when the fields they derive from change"""
+    state = db.inspect(job)
+    if any(state.attrs[field].history.has_changes() for field in ('title', 'company', 'location')):
+        job.dedup_key = make_dedup_key(job.title, job.company, job.location)
+    if state.attrs.salary.history.has_changes():
+        _set_salary_columns(job)
+
+def _set_salary_columns(job):
+    for field, value in salary_columns(job.salary).items():
+        setattr(job, field, value)
+
+class JobStat(db.Model):
+    """Running count of jobs per value of a statistics dimension"""
+    
+    __tablename__ = 'job_stats'
+    
+    dimension = db.Column(db.String(32), primary_key=True)
+    value = db.Column(db.String(200), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.Index('ix_job_stats_dimension_count', 'dimension', 'count'),
+    )
+    
+    def __repr__(self):
+        """String representation"""
+        return f'<JobStat {self.dimension}={self.value}: {self.count}>'
+
+class JobLshBucket(db.Model):
+    """Membership of a job in a locality-sensitive hashing bucket of near-duplicate detection"""
+    
+    __tablename__ = 'job_lsh_buckets'
+    
+    bucket = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    job_id = db.Column(db.Integer, primary_key=True, autoincrement=False, index=True)
+    
+    def __repr__(self):
+        """String representation"""
+        return f'<JobLshBucket {self.bucket}: job {self.job_id}>'
+
+class JobsVersion(db.Model):
+    """Change counters of the jobs table, kept by triggers and shared by every process"""
+    
+    __tablename__ = 'jobs_version'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    # Bumped by every insert, update and delete of a job
+    version = db.Column(db.Integer, nullable=False, default=0)
+    deletes = db.Column(db.Integer, nullable=False, default=0)
     
     def __repr__(self):
         """String representation"""
-        return f'<Job {self.title} at {self.company}>'
\ No newline at end of file
+        return f'<JobsVersion {self.version} ({self.deletes} deletes)>'
\ No newline at end of file
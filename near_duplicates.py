@@ -0,0 +1,376 @@
+import zlib
+import random
+import hashlib
+import logging
+from database import db
+from models import Job, JobLshBucket, normalize_text
+from enrichment import PLACEHOLDER_DESCRIPTION
+
+logger = logging.getLogger(__name__)
+
+# Weight of each field in the similarity of two jobs. A reposted listing
+# keeps its company and location while its title and description drift;
+# the same title at another location is a different listing. Fields empty
+# in either job, like the description of scraped jobs, are left out.
+FIELD_WEIGHTS = {
+    'title': 0.4,
+    'company': 0.2,
+    'location': 0.25,
+    'description': 0.15,
+}
+
+# Jobs at least this similar are duplicates of the earliest of them. With
+# matching company and location and no description, titles must share at
+# least 4 in 5 words.
+DEFAULT_THRESHOLD = 0.9
+
+# Title similarity below which jobs are never duplicates, whatever the
+# other fields, so a shared company, location and boilerplate description
+# cannot make up for a different role
+MIN_TITLE_SIMILARITY = 0.75
+
+# Title words telling apart roles that differ only in seniority ('Senior
+# ML Engineer' and 'ML Engineer'); jobs are only duplicates when their
+# titles have the same of these
+LEVEL_WORDS = frozenset((
+    'senior', 'lead', 'principal', 'staff', 'architect', 'head', 'chief', 'director',
+    'mid', 'intermediate', 'associate', 'junior', 'entry', 'intern', 'internship', 'graduate',
+    'i', 'ii', 'iii', 'iv', 'v', '1', '2', '3', '4', '5',
+))
+
+# MinHash signature length, split between fields by weight, and the LSH
+# bands cut from it. Jobs sharing any band are compared; with 8 bands of
+# 8 rows, pairs at 0.9 similarity are found about 99% of the time, at 0.85
+# about 92% and at 0.6 about 12%.
+NUM_PERM = 64
+BANDS = 8
+
+# Description words shingled, enough to tell boilerplate from a real description
+DESCRIPTION_WORDS = 100
+
+# Common title abbreviations, expanded before comparing
+ABBREVIATIONS = {
+    'sr': 'senior', 'jr': 'junior', 'eng': 'engineer', 'engr': 'engineer', 'dev': 'developer',
+    'mgr': 'manager', 'swe': 'software engineer', 'sde': 'software engineer',
+}
+
+# Fields of the kept job filled from a merged duplicate when empty
+MERGE_FIELDS = ('description', 'salary', 'salary_min', 'salary_max', 'salary_currency', 'application_url')
+
+TEXT_FIELDS = tuple(FIELD_WEIGHTS)
+
+# Keys per IN (...) lookup, well below SQLite's bound parameter limit
+LOOKUP_CHUNK_SIZE = 500
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(20240301)
+_PERMUTATIONS = {}
+for _field, _weight in FIELD_WEIGHTS.items():
+    # The last field takes the positions left over by rounding
+    _count = NUM_PERM - sum(map(len, _PERMUTATIONS.values())) if _field == 'description' \
+        else round(NUM_PERM * _weight)
+    _PERMUTATIONS[_field] = [(_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(_MERSENNE_PRIME))
+                             for _ in range(_count)]
+# Signature positions are interleaved so every band mixes fields
+_ORDER = _rng.sample(range(NUM_PERM), NUM_PERM)
+_ROWS_PER_BAND = NUM_PERM // BANDS
+_EMPTY = _MERSENNE_PRIME
+
+
+def _words(text):
+    words = []
+    for word in normalize_text(text).split():
+        words.extend(ABBREVIATIONS.get(word, word).split())
+    return words
+
+
+def _hashes(tokens):
+    return frozenset(zlib.crc32(token.encode('utf-8')) for token in tokens)
+
+
+_PLACEHOLDER_WORDS = normalize_text(PLACEHOLDER_DESCRIPTION)
+
+
+def shingles(job):
+    """Hashed shingles of each text field of a job mapping, and its title level words.
+
+    Title, company and location are compared as sets of words, the
+    description as a set of three-word phrases of its first words. The
+    placeholder description of scraped jobs has no shingles.
+    """
+    title = _words(job.get('title'))
+    result = {'title': _hashes(title), 'levels': frozenset(w for w in title if w in LEVEL_WORDS)}
+    for field in ('company', 'location'):
+        result[field] = _hashes(_words(job.get(field)))
+    description = job.get('description')
+    words = [] if normalize_text(description) == _PLACEHOLDER_WORDS else _words(description)[:DESCRIPTION_WORDS]
+    result['description'] = _hashes(' '.join(words[i:i + 3]) for i in range(max(1, len(words) - 2)) if words)
+    return result
+
+
+def _jaccard(a, b):
+    union = len(a | b)
+    return len(a & b) / union if union else 1.0
+
+
+def similarity(a, b):
+    """Weighted Jaccard similarity of the shingles of two jobs.
+
+    Fields empty in either job are left out and the weights of the others
+    scaled up to sum to one.
+    """
+    score = total = 0.0
+    for field, weight in FIELD_WEIGHTS.items():
+        if a[field] and b[field]:
+            score += weight * _jaccard(a[field], b[field])
+            total += weight
+    return score / total if total else 0.0
+
+
+def is_near_duplicate(a, b, threshold=DEFAULT_THRESHOLD):
+    """Whether two jobs, given their shingles, are near-duplicates.
+
+    Their titles must name the same level, be at least
+    MIN_TITLE_SIMILARITY similar on their own, and the jobs at least
+    threshold similar overall.
+    """
+    return (a['levels'] == b['levels']
+            and _jaccard(a['title'], b['title']) >= MIN_TITLE_SIMILARITY
+            and similarity(a, b) >= threshold)
+
+
+def signature(job_shingles):
+    """MinHash signature of a job's shingles, positions per field in proportion to its weight"""
+    values = []
+    for field, permutations in _PERMUTATIONS.items():
+        hashes = job_shingles[field]
+        if not hashes:
+            values.extend([_EMPTY] * len(permutations))
+            continue
+        for a, b in permutations:
+            values.append(min((a * h + b) % _MERSENNE_PRIME for h in hashes))
+    return [values[i] for i in _ORDER]
+
+
+def band_keys(job_signature):
+    """LSH bucket key of each band of a signature, as signed 64-bit integers"""
+    keys = []
+    for band in range(BANDS):
+        rows = job_signature[band * _ROWS_PER_BAND:(band + 1) * _ROWS_PER_BAND]
+        digest = hashlib.blake2b(repr((band, rows)).encode(), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, 'big', signed=True))
+    return keys
+
+
+def _features(job):
+    job_shingles = shingles(job)
+    return job_shingles, band_keys(signature(job_shingles))
+
+
+def _chunks(values):
+    values = list(values)
+    for start in range(0, len(values), LOOKUP_CHUNK_SIZE):
+        yield values[start:start + LOOKUP_CHUNK_SIZE]
+
+
+def _candidates(keys, session):
+    """Stored job ids per bucket key"""
+    found = {}
+    for chunk in _chunks(set(keys)):
+        for bucket, job_id in session.query(JobLshBucket.bucket, JobLshBucket.job_id).filter(
+            JobLshBucket.bucket.in_(chunk)
+        ):
+            found.setdefault(bucket, set()).add(job_id)
+    return found
+
+
+def _load_shingles(job_ids, session):
+    """Shingles of stored jobs by id; ids of deleted jobs are left out"""
+    loaded = {}
+    for chunk in _chunks(job_ids):
+        for row in session.query(Job.id, *[getattr(Job, f) for f in TEXT_FIELDS]).filter(Job.id.in_(chunk)):
+            loaded[row.id] = shingles(row._mapping)
+    return loaded
+
+
+def find_near_duplicates(jobs, threshold=DEFAULT_THRESHOLD, session=None):
+    """Match each job mapping to an earlier similar job, stored or in the batch.
+
+    Stored jobs are found through the LSH buckets of the job_lsh_buckets
+    table, so only jobs sharing a band are read and compared, never the
+    whole table. Jobs with an 'id' only match stored jobs with a smaller
+    id. Returns, per job, the id of the stored job it duplicates, the
+    index of the earlier job of the batch it duplicates (as a negative
+    number, -1 - index), or None, along with the band keys of every job.
+    """
+    session = session or db.session
+    features = [_features(job) for job in jobs]
+    stored = _candidates([key for _, keys in features for key in keys], session)
+    candidate_ids = set().union(*stored.values()) if stored else set()
+    stored_shingles = _load_shingles(candidate_ids, session)
+
+    matches = []
+    batch_buckets = {}
+    for index, (job, (job_shingles, keys)) in enumerate(zip(jobs, features)):
+        own_id = job.get('id')
+        match = None
+        ids = sorted({job_id for key in keys for job_id in stored.get(key, ())
+                      if job_id in stored_shingles and (own_id is None or job_id < own_id)})
+        for job_id in ids:
+            if is_near_duplicate(job_shingles, stored_shingles[job_id], threshold):
+                match = job_id
+                break
+        if match is None:
+            earlier = sorted({i for key in keys for i in batch_buckets.get(key, ())})
+            for i in earlier:
+                if is_near_duplicate(job_shingles, features[i][0], threshold):
+                    match = -1 - i
+                    break
+        if match is None:
+            for key in keys:
+                batch_buckets.setdefault(key, []).append(index)
+        matches.append(match)
+    return matches, [keys for _, keys in features]
+
+
+def index_jobs(jobs, keys=None, connection=None):
+    """Add jobs, mappings with an id, to the LSH buckets.
+
+    keys are their band keys when already computed by find_near_duplicates.
+    """
+    if keys is None:
+        keys = [_features(job)[1] for job in jobs]
+    rows = [{'bucket': key, 'job_id': job['id']} for job, job_keys in zip(jobs, keys) for key in job_keys]
+    if rows:
+        (connection or db.session).execute(db.insert(JobLshBucket), rows)
+    return len(rows)
+
+
+def unindex_jobs(job_ids, connection=None):
+    """Remove jobs from the LSH buckets"""
+    for chunk in _chunks(job_ids):
+        (connection or db.session).execute(db.delete(JobLshBucket).where(JobLshBucket.job_id.in_(chunk)))
+
+
+def reindex_jobs(job_ids):
+    """Recompute the LSH buckets of stored jobs, e.g. after a bulk update of their text"""
+    job_ids = list(job_ids)
+    unindex_jobs(job_ids)
+    for chunk in _chunks(job_ids):
+        jobs = [dict(row._mapping) for row in db.session.query(
+            Job.id, *[getattr(Job, f) for f in TEXT_FIELDS]).filter(Job.id.in_(chunk))]
+        index_jobs(jobs)
+
+
+@db.event.listens_for(Job, 'after_insert')
+def _index_new_job(mapper, connection, job):
+    index_jobs([_job_mapping(job)], connection=connection)
+
+
+@db.event.listens_for(Job, 'after_update')
+def _reindex_job(mapper, connection, job):
+    state = db.inspect(job)
+    if any(state.attrs[field].history.has_changes() for field in TEXT_FIELDS):
+        unindex_jobs([job.id], connection=connection)
+        index_jobs([_job_mapping(job)], connection=connection)
+
+
+def _job_mapping(job):
+    return {'id': job.id, **{field: getattr(job, field) for field in TEXT_FIELDS}}
+
+
+_LSH_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS job_lsh_buckets_ad AFTER DELETE ON jobs BEGIN
+        DELETE FROM job_lsh_buckets WHERE job_id = old.id;
+    END""",
+]
+
+
+def init_near_duplicates(engine):
+    """Create the trigger dropping the buckets of deleted jobs.
+
+    Other databases leave buckets of deleted jobs behind, which lookups
+    ignore and compaction removes. An empty index over existing jobs is
+    built by compact_near_duplicates().
+    """
+    with engine.begin() as conn:
+        if engine.dialect.name == 'sqlite':
+            for statement in _LSH_TRIGGERS:
+                conn.exec_driver_sql(statement)
+        indexed = conn.execute(db.select(JobLshBucket.job_id).limit(1)).first()
+        stored = conn.execute(db.select(Job.id).limit(1)).first()
+    if stored and not indexed:
+        logger.warning("Near-duplicate index is empty; run 'flask compact-jobs' to build it")
+
+
+def _merge(kept, duplicate):
+    """Fields of kept to update from a duplicate: empty ones filled, the latest posted_date"""
+    changes = {}
+    for field in MERGE_FIELDS:
+        value = duplicate[field]
+        if value and (not kept[field] or field == 'description' and len(value) > len(kept[field])):
+            changes[field] = kept[field] = value
+    if duplicate['posted_date'] and (kept['posted_date'] is None or duplicate['posted_date'] > kept['posted_date']):
+        changes['posted_date'] = kept['posted_date'] = duplicate['posted_date']
+    return changes
+
+
+def compact_near_duplicates(threshold=DEFAULT_THRESHOLD, batch_size=1000, dry_run=False):
+    """Rebuild the LSH index over all jobs, merging near-duplicates into the earliest.
+
+    Jobs are read in id order, batch_size at a time. Each is compared with
+    the earlier jobs sharing one of its buckets; a duplicate's missing
+    fields and later posted_date are merged into the job it duplicates,
+    then it is deleted. Batches are committed as they go, except with
+    dry_run, where everything is rolled back at the end. Returns the
+    number of jobs scanned and of duplicates found.
+    """
+    session = db.session
+    columns = [Job.id, Job.posted_date, *[getattr(Job, f) for f in dict.fromkeys(TEXT_FIELDS + MERGE_FIELDS)]]
+    session.execute(db.delete(JobLshBucket))
+
+    scanned = duplicates = 0
+    last_id = 0
+    while True:
+        batch = [dict(row._mapping) for row in session.query(*columns).filter(
+            Job.id > last_id).order_by(Job.id).limit(batch_size)]
+        if not batch:
+            break
+        last_id = batch[-1]['id']
+        scanned += len(batch)
+
+        matches, keys = find_near_duplicates(batch, threshold, session)
+        kept_jobs, kept_keys, merged, removed = [], [], {}, []
+        for job, match, job_keys in zip(batch, matches, keys):
+            if match is None:
+                kept_jobs.append(job)
+                kept_keys.append(job_keys)
+                continue
+            if match not in merged:
+                target = batch[-1 - match] if match < 0 else dict(
+                    session.query(*columns).filter(Job.id == match).one()._mapping)
+                merged[match] = (target, {})
+            target, changes = merged[match]
+            changes.update(_merge(target, job))
+            removed.append(job['id'])
+
+        index_jobs(kept_jobs, kept_keys)
+        updates = [{'id': target['id'], **changes} for target, changes in merged.values() if changes]
+        if updates:
+            session.execute(db.update(Job), updates)
+        for chunk in _chunks(removed):
+            session.execute(db.delete(Job).where(Job.id.in_(chunk)))
+        duplicates += len(removed)
+        if not dry_run:
+            session.commit()
+
+    if dry_run:
+        session.rollback()
+    else:
+        # Buckets of jobs deleted where no trigger removed them
+        session.execute(db.delete(JobLshBucket).where(JobLshBucket.job_id.notin_(db.select(Job.id))))
+        session.commit()
+
+    logger.info(f"Compacted jobs: {duplicates} near-duplicates of {scanned} jobs"
+                f"{' found (dry run)' if dry_run else ' merged'}")
+    return {'scanned': scanned, 'duplicates': duplicates}
@@ -0,0 +1,147 @@
+import base64
+import json
+from datetime import datetime
+from database import db
+from models import Job
+
+# Columns that can be used as a sort key for keyset pagination; each is
+# indexed so no page needs a sort of the whole table
+SORTABLE_FIELDS = ('id', 'title', 'company', 'location', 'posted_date', 'salary_min', 'salary_max')
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class PaginationError(ValueError):
+    """Raised when pagination or projection parameters are invalid"""
+
+
+def parse_fields(raw):
+    """Parse a comma separated fields= parameter into a tuple of job fields"""
+    if not raw:
+        return Job.FIELDS
+
+    fields = tuple(dict.fromkeys(f.strip() for f in raw.split(',') if f.strip()))
+    unknown = [f for f in fields if f not in Job.FIELDS]
+    if unknown:
+        raise PaginationError(f"Unknown fields: {', '.join(unknown)}")
+    return fields or Job.FIELDS
+
+
+def parse_limit(raw, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Parse the limit= parameter, clamped to the allowed page size"""
+    if raw is None or raw == '':
+        return default
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise PaginationError('limit must be an integer')
+    if limit < 1:
+        raise PaginationError('limit must be positive')
+    return min(limit, maximum)
+
+
+def encode_cursor(sort_by, sort_order, value, last_id):
+    """Encode the position after the last row of a page as an opaque token"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps([sort_by, sort_order, value, last_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, sort_by, sort_order):
+    """Decode a cursor token, checking it was issued for the same ordering"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        cursor_sort, cursor_order, value, last_id = json.loads(base64.urlsafe_b64decode(padded))
+        if sort_by == 'posted_date' and value is not None:
+            value = datetime.fromisoformat(value)
+        last_id = int(last_id)
+    except (ValueError, TypeError):
+        raise PaginationError('Invalid cursor')
+
+    if (cursor_sort, cursor_order) != (sort_by, sort_order):
+        raise PaginationError('Cursor does not match sort_by/sort_order')
+    return value, last_id
+
+
+def _after_cursor(column, descending, value, last_id):
+    """Build the keyset predicate selecting rows after (value, last_id)"""
+    if value is None:
+        # NULLs sort first ascending and last descending
+        if descending:
+            return db.and_(column.is_(None), Job.id < last_id)
+        return db.or_(db.and_(column.is_(None), Job.id > last_id), column.isnot(None))
+
+    if column is Job.id:
+        return Job.id < last_id if descending else Job.id > last_id
+
+    key = db.tuple_(column, Job.id)
+    if descending:
+        predicate = key < db.tuple_(value, last_id)
+        if getattr(column, 'nullable', False):
+            predicate = db.or_(predicate, column.is_(None))
+        return predicate
+    return key > db.tuple_(value, last_id)
+
+
+def parse_sort(args, relevance=None):
+    """Read sort_by/sort_order from request args, by relevance by default when searching"""
+    sort_by = args.get('sort_by', 'relevance' if relevance is not None else 'posted_date')
+    sort_order = args.get('sort_order', 'desc')
+    if sort_by == 'relevance' and relevance is None or \
+            sort_by != 'relevance' and sort_by not in SORTABLE_FIELDS:
+        sort_by = 'posted_date'
+    if sort_order not in ('asc', 'desc'):
+        sort_order = 'desc'
+    return sort_by, sort_order
+
+
+def page_statement(query, sort_by, sort_order, fields, limit, cursor=None, sort_column=None):
+    """Select one page of columns from a select(Job) statement, ordered by (sort_by, id).
+
+    sort_column overrides the Job column named by sort_by with a computed
+    expression such as a search relevance score. One row more than limit
+    is selected to tell whether another page follows.
+    """
+    column = sort_column if sort_column is not None else getattr(Job, sort_by)
+    descending = sort_order == 'desc'
+
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort_by, sort_order)
+        query = query.filter(_after_cursor(column, descending, value, last_id))
+
+    order = [column.desc() if descending else column.asc()]
+    if column is not Job.id:
+        order.append(Job.id.desc() if descending else Job.id.asc())
+
+    # Always select the keyset columns so the next cursor can be built
+    selected = [getattr(Job, f) for f in dict.fromkeys(fields + ('id',))]
+    if sort_column is not None:
+        selected.append(sort_column.label(sort_by))
+    elif sort_by not in fields + ('id',):
+        selected.append(column)
+    return query.with_only_columns(*selected).order_by(*order).limit(limit + 1)
+
+
+def split_page(rows, sort_by, sort_order, limit):
+    """Trim the rows of page_statement to limit, returning them and the next page's cursor"""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort_by, sort_order, getattr(last, sort_by), last.id)
+    return rows, next_cursor
+
+
+def paginate(query, sort_by, sort_order, fields, limit, cursor=None, sort_column=None):
+    """Fetch one page of selected columns ordered by (sort_by, id).
+
+    query is a select(Job) statement, see page_statement. Returns the rows
+    of the page and the cursor for the next page, or None when the page is
+    the last one.
+    """
+    rows = db.session.execute(
+        page_statement(query, sort_by, sort_order, fields, limit, cursor, sort_column)
+    ).all()
+    return split_page(rows, sort_by, sort_order, limit)
@@ -0,0 +1,176 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+from flask import current_app, request
+from signals import jobs_changed
+from table_version import read_version
+
+# Response headers stored alongside a cached body
+CACHED_HEADERS = ('X-Next-Cursor', 'Link')
+
+
+class CacheEntry:
+    """A cached response body, its validator and expiry time"""
+
+    __slots__ = ('etag', 'body', 'headers', 'mimetype', 'expires')
+
+    def __init__(self, etag, body, headers, mimetype, expires=None):
+        self.etag = etag
+        self.body = body
+        self.headers = headers
+        self.mimetype = mimetype
+        self.expires = expires
+
+
+class ResponseCache:
+    """Size-bounded LRU cache of GET responses keyed on normalized query parameters.
+
+    Every cached response is invalidated when the jobs table version is
+    bumped. Writes in this process bump it at once through the
+    jobs_changed signal. Writes by other processes, such as another worker
+    or a CLI command, are noticed from the shared jobs_version counters
+    (see table_version), which are read at most once per version_ttl
+    seconds so hits and 304s normally run no query; they may be served
+    stale for up to that long. Entries also expire after ttl seconds,
+    which bounds staleness where the counters are not maintained.
+    Responses carry a strong ETag, so a matching If-None-Match on a cached
+    entry is answered with 304 without running the view.
+    """
+
+    def __init__(self, app=None, max_entries=512, max_bytes=32 * 1024 * 1024, ttl=60.0, version_ttl=1.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.version_ttl = version_ttl
+        self.version = 0
+        self.shared_version = None
+        self._version_checked_at = None
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register the cache on the app, sized from RESPONSE_CACHE_* settings"""
+        self.max_entries = app.config.get('RESPONSE_CACHE_MAX_ENTRIES', self.max_entries)
+        self.max_bytes = app.config.get('RESPONSE_CACHE_MAX_BYTES', self.max_bytes)
+        self.ttl = app.config.get('RESPONSE_CACHE_TTL', self.ttl)
+        self.version_ttl = app.config.get('RESPONSE_CACHE_VERSION_TTL', self.version_ttl)
+        app.extensions['response_cache'] = self
+        jobs_changed.connect(self._on_jobs_changed, sender=app, weak=False)
+
+    def bump(self):
+        """Advance the table version, dropping every cached response"""
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            self._size = 0
+
+    def version_due(self):
+        """Whether the shared counters should be read now; claims the check for version_ttl seconds"""
+        now = time.monotonic()
+        with self._lock:
+            if self._version_checked_at is not None and now - self._version_checked_at < self.version_ttl:
+                return False
+            self._version_checked_at = now
+            return True
+
+    def sync(self, shared_version):
+        """Bump the version if the shared jobs_version counters changed since the last call"""
+        if shared_version is None or shared_version == self.shared_version:
+            return
+        with self._lock:
+            if shared_version != self.shared_version:
+                self.shared_version = shared_version
+                self.version += 1
+                self._entries.clear()
+                self._size = 0
+
+    def _on_jobs_changed(self, sender, **extra):
+        self.bump()
+
+    def lookup(self, key):
+        """The entry cached under key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires is not None and entry.expires <= time.monotonic():
+                del self._entries[key]
+                self._size -= len(entry.body)
+                return None
+            self._entries.move_to_end(key)
+        return entry
+
+    def store(self, key, version, body, headers, mimetype):
+        """Cache a response body computed at table version, returning its ETag"""
+        etag = hashlib.sha1(body).hexdigest()
+        expires = time.monotonic() + self.ttl if self.ttl > 0 else None
+        self._put(key, version, CacheEntry(etag, body, headers, mimetype, expires))
+        return etag
+
+    def serve(self, view, *args, **kwargs):
+        """Answer a request from the cache, or run the view and cache its 200 response"""
+        if self.max_entries <= 0:
+            return view(*args, **kwargs)
+
+        if self.version_due():
+            self.sync(read_version())
+        key = self._key()
+        entry = self.lookup(key)
+        if entry is not None:
+            response = current_app.response_class(entry.body, mimetype=entry.mimetype, headers=entry.headers)
+            response.set_etag(entry.etag)
+            response.headers['X-Cache'] = 'HIT'
+            return response.make_conditional(request)
+
+        version = self.version
+        response = current_app.make_response(view(*args, **kwargs))
+        if response.status_code != 200 or response.is_streamed:
+            return response
+
+        headers = {h: response.headers[h] for h in CACHED_HEADERS if h in response.headers}
+        response.set_etag(self.store(key, version, response.get_data(), headers, response.mimetype))
+        response.headers['X-Cache'] = 'MISS'
+        return response.make_conditional(request)
+
+    def _key(self):
+        return make_key(request.path, request.headers.get('Accept', ''), request.args.items(multi=True))
+
+    def _put(self, key, version, entry):
+        size = len(entry.body)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            # Skip responses computed before a concurrent write bumped the version
+            if version != self.version:
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous.body)
+            self._entries[key] = entry
+            self._size += size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.body)
+
+
+def make_key(path, accept, args):
+    """Cache key from the path, the Accept header and the sorted non-empty (name, value) arguments"""
+    args = sorted((k, v.strip()) for k, v in args if v.strip())
+    return (path, accept, urlencode(args))
+
+
+def cached_response(view):
+    """Serve a view through the app's ResponseCache, if one is registered"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        cache = current_app.extensions.get('response_cache')
+        if cache is None:
+            return view(*args, **kwargs)
+        return cache.serve(view, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,112 @@
+import logging
+from datetime import datetime, timedelta
+from database import db
+from models import Job
+from metrics import registry
+
+logger = logging.getLogger(__name__)
+
+JOBS_EXPIRED = registry.counter(
+    'jobs_expired_total', 'Jobs removed by the retention policy, by mode', ('mode',))
+
+RETENTION_MODES = ('delete', 'archive')
+
+# Jobs removed per statement and transaction, below SQLite's bound parameter limit
+DEFAULT_BATCH_SIZE = 500
+
+ARCHIVE_TABLE_PREFIX = 'jobs_archive_'
+
+_archive_metadata = db.MetaData()
+
+
+def archive_table_name(posted_date):
+    """Name of the monthly archive table of jobs posted at posted_date"""
+    return f'{ARCHIVE_TABLE_PREFIX}{posted_date:%Y_%m}'
+
+
+def archive_table(name):
+    """The archive table called name, with the columns of jobs and no indexes.
+
+    SQLite may reuse the ids of deleted jobs, so id is not a key of archives.
+    """
+    if name in _archive_metadata.tables:
+        return _archive_metadata.tables[name]
+    columns = [db.Column(c.name, c.type) for c in Job.__table__.columns]
+    return db.Table(name, _archive_metadata, *columns)
+
+
+def _month_end(posted_date):
+    first = posted_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    return (first + timedelta(days=32)).replace(day=1)
+
+
+def expired_filter(cutoff, scraped_only=True):
+    """Predicate of the jobs posted before cutoff, a range on the posted_date indexes"""
+    predicate = Job.posted_date < cutoff
+    if scraped_only:
+        predicate = db.and_(Job.scraped.is_(True), predicate)
+    return predicate
+
+
+def expire_jobs(max_age, mode='delete', scraped_only=True, batch_size=DEFAULT_BATCH_SIZE,
+                now=None, dry_run=False):
+    """Remove jobs posted more than max_age (a timedelta) ago, oldest first.
+
+    Jobs are removed in batches of batch_size, each its own transaction,
+    so writers are never blocked for long. Each batch is the next range of
+    posted dates, selected from the (scraped, posted_date) or posted_date
+    index. In 'archive' mode a batch's rows are first copied to the
+    monthly archive table of their posted date (jobs_archive_YYYY_MM),
+    created on demand; archive tables can be queried or dropped whole.
+    Manually added jobs are kept unless scraped_only is False. With
+    dry_run only the expired jobs are counted. Returns a summary.
+    """
+    if mode not in RETENTION_MODES:
+        raise ValueError(f"Unknown retention mode {mode!r}, expected one of {', '.join(RETENTION_MODES)}")
+    cutoff = (now or datetime.utcnow()) - max_age
+    predicate = expired_filter(cutoff, scraped_only)
+    session = db.session
+
+    if dry_run:
+        count = session.query(db.func.count(Job.id)).filter(predicate).scalar()
+        return {'cutoff': cutoff.isoformat(), 'expired': count, 'archive_tables': [], 'dry_run': True}
+
+    expired = 0
+    tables = set()
+    while True:
+        batch = session.query(Job.id, Job.posted_date).filter(predicate).order_by(
+            Job.posted_date).limit(batch_size).all()
+        if not batch:
+            break
+        ids = [job_id for job_id, _ in batch]
+        if mode == 'archive':
+            tables.update(_archive(ids, batch[0].posted_date, batch[-1].posted_date))
+        session.execute(db.delete(Job).where(Job.id.in_(ids)))
+        session.commit()
+        expired += len(ids)
+        JOBS_EXPIRED.inc(len(ids), mode=mode)
+
+    if expired:
+        logger.info(f"Expired {expired} jobs posted before {cutoff.isoformat()}"
+                    f"{' into ' + ', '.join(sorted(tables)) if tables else ''}")
+    return {'cutoff': cutoff.isoformat(), 'expired': expired, 'archive_tables': sorted(tables), 'dry_run': False}
+
+
+def _archive(ids, first, last):
+    """Copy the jobs with the given ids, posted between first and last, to their monthly archive tables"""
+    session = db.session
+    columns = [c.name for c in Job.__table__.columns]
+    names = []
+    start = first
+    while start is not None and start <= last:
+        end = _month_end(start)
+        table = archive_table(archive_table_name(start))
+        table.create(session.connection(), checkfirst=True)
+        session.execute(table.insert().from_select(
+            columns,
+            db.select(*[Job.__table__.c[name] for name in columns]).where(
+                Job.id.in_(ids), Job.posted_date >= start, Job.posted_date < end)
+        ))
+        names.append(table.name)
+        start = end
+    return names
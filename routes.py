@@ -1,7 +1,21 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, current_app, url_for, stream_with_context
+from concurrent import futures
 from datetime import datetime
-from database import db
+from database import db, use_read_bind
+from sqlalchemy.exc import IntegrityError
 from models import Job
+from search import apply_search
+import stats
+from signals import jobs_changed
+from response_cache import cached_response
+from scrape_queue import scrape_params
+from serialization import RowSerializer, get_encoder, json_response
+from compression import compress_response
+from instrumentation import record_rows, timed
+from metrics import registry
+from batch import BatchError, parse_batch, create_jobs, update_jobs, delete_jobs
+from pagination import (DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, PaginationError,
+                        parse_fields, parse_limit, parse_sort, paginate)
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -9,36 +23,162 @@ logger = logging.getLogger(__name__)
 
 api_bp = Blueprint('api', __name__)
 
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+# Requests that never write, so their queries may run on the read bind
+READ_ONLY_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Exact-match filters and the columns they compare against (case-insensitive)
+EXACT_FILTERS = {
+    'location': Job.location,
+    'company': Job.company,
+    'job_type': Job.job_type,
+    'experience': Job.experience_level,
+    'currency': Job.salary_currency,
+}
+
+# Yearly salary bounds: jobs whose range reaches min_salary, or starts at or below max_salary
+SALARY_FILTERS = {
+    'min_salary': lambda value: Job.salary_max >= value,
+    'max_salary': lambda value: Job.salary_min <= value,
+}
+
+def filter_jobs(query, args):
+    """Apply the listing filters from the query string.
+
+    Raises PaginationError for a malformed salary bound.
+    """
+    for param, column in EXACT_FILTERS.items():
+        value = args.get(param, '').strip()
+        if value:
+            query = query.filter(db.func.lower(column) == value.lower())
+    for param, predicate in SALARY_FILTERS.items():
+        value = args.get(param, '').strip()
+        if value:
+            try:
+                query = query.filter(predicate(int(value)))
+            except ValueError:
+                raise PaginationError(f'{param} must be an integer')
+    return query
+
+def scrape_task_response(task, created):
+    """Body and status of a scrape request: the result once finished, else 202"""
+    if task.done:
+        return task.to_dict(), 200
+    return {
+        'message': 'Scraping queued' if created else 'Scraping already in progress',
+        'task_id': task.id,
+        'status': task.status
+    }, 202
+
+api_bp.after_request(compress_response)
+
+@api_bp.before_request
+def route_reads():
+    """Run the queries of read-only requests on the read bind, if one is configured.
+
+    Set on every request, as requests sharing an app context share the session.
+    """
+    use_read_bind(request.method in READ_ONLY_METHODS)
+
 @api_bp.route('/jobs', methods=['GET'])
+@cached_response
 def get_jobs():
     """Get jobs with filtering and sorting"""
     try:
-        query = Job.query
+        if request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE:
+            return export_jobs()
         
-        # Apply filters if provided
-        if request.args.get('location'):
-            query = query.filter(Job.location.ilike(f"%{request.args.get('location')}%"))
-        if request.args.get('company'):
-            query = query.filter(Job.company.ilike(f"%{request.args.get('company')}%"))
-        if request.args.get('job_type'):
-            query = query.filter(Job.job_type.ilike(f"%{request.args.get('job_type')}%"))
-        if request.args.get('experience'):
-            query = query.filter(Job.experience_level.ilike(f"%{request.args.get('experience')}%"))
+        query = filter_jobs(db.select(Job), request.args)
+        query, relevance = apply_search(query, request.args.get('q'))
         
-        # Apply sorting
-        sort_by = request.args.get('sort_by', 'posted_date')
-        sort_order = request.args.get('sort_order', 'desc')
+        # Apply sorting, by relevance by default when searching
+        sort_by, sort_order = parse_sort(request.args, relevance)
         
-        order_col = getattr(Job, sort_by, Job.posted_date)
-        query = query.order_by(order_col.desc() if sort_order == 'desc' else order_col.asc())
+        # Fetch a single keyset page of the requested columns only
+        fields = parse_fields(request.args.get('fields'))
+        limit = parse_limit(
+            request.args.get('limit'),
+            default=current_app.config.get('JOBS_PAGE_SIZE', DEFAULT_PAGE_SIZE),
+            maximum=current_app.config.get('JOBS_MAX_PAGE_SIZE', MAX_PAGE_SIZE)
+        )
+        rows, next_cursor = paginate(query, sort_by, sort_order, fields, limit,
+                                     cursor=request.args.get('cursor'),
+                                     sort_column=relevance if sort_by == 'relevance' else None)
         
-        jobs = query.all()
-        return jsonify([job.to_dict() for job in jobs])
+        # Same sorted key order as jsonify, built straight from the row tuples
+        with timed('serialize'):
+            response = json_response(RowSerializer(fields, sort_keys=True).serialize(rows))
+        record_rows(len(rows))
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+            next_url = url_for('api.get_jobs', **{**request.args.to_dict(), 'cursor': next_cursor})
+            response.headers['Link'] = f'<{next_url}>; rel="next"'
+        return response
         
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error fetching jobs: {e}")
         return jsonify({'error': 'Failed to fetch jobs'}), 500
 
+@api_bp.route('/jobs/export', methods=['GET'])
+def export_jobs():
+    """Stream all matching jobs as NDJSON or a chunked JSON array"""
+    try:
+        fields = parse_fields(request.args.get('fields'))
+        query = filter_jobs(Job.query, request.args)
+    except PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    output_format = request.args.get('format', 'ndjson')
+    if output_format not in ('ndjson', 'json'):
+        return jsonify({'error': 'format must be ndjson or json'}), 400
+    
+    batch_size = current_app.config.get('EXPORT_BATCH_SIZE', 1000)
+    query, _ = apply_search(query, request.args.get('q'))
+    query = query.with_entities(
+        *[getattr(Job, f) for f in fields]
+    ).order_by(Job.id).yield_per(batch_size)
+    
+    serializer = RowSerializer(fields)
+    encoder = get_encoder()
+    
+    def encode(rows):
+        record_rows(len(rows))
+        if output_format == 'json':
+            # Items of an encoded array, without its brackets
+            return encoder.dumps(serializer.serialize(rows))[1:-1]
+        return b'\n'.join(encoder.dumps(serializer(row)) for row in rows)
+    
+    separator = b',' if output_format == 'json' else b'\n'
+    
+    def generate():
+        # Rows are read in batches and written one chunk per batch
+        try:
+            if output_format == 'json':
+                yield b'['
+            chunk = []
+            first = True
+            for row in query:
+                chunk.append(row)
+                if len(chunk) >= batch_size:
+                    yield (b'' if first else separator) + encode(chunk)
+                    chunk = []
+                    first = False
+            if chunk:
+                yield (b'' if first else separator) + encode(chunk)
+            if output_format == 'json':
+                yield b']'
+            elif not first or chunk:
+                yield b'\n'
+        except Exception as e:
+            logger.error(f"Error exporting jobs: {e}")
+            raise
+    
+    mimetype = 'application/json' if output_format == 'json' else NDJSON_MIMETYPE
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
 @api_bp.route('/jobs', methods=['POST'])
 def add_job():
     """Add a new job listing"""
@@ -65,16 +205,50 @@ def add_job():
         
         db.session.add(new_job)
         db.session.commit()
+        jobs_changed.send(current_app._get_current_object())
         
         return jsonify({
             'message': 'Job added successfully',
             'job': new_job.to_dict()
         }), 201
         
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Job already exists'}), 409
     except Exception as e:
         logger.error(f"Error adding job: {e}")
         return jsonify({'error': 'Failed to add job'}), 500
 
+@api_bp.route('/jobs/batch', methods=['POST', 'PUT', 'DELETE'])
+def batch_jobs():
+    """Create (POST), update (PUT) or delete (DELETE) many jobs in one transaction"""
+    try:
+        items = parse_batch(request.get_data(), request.mimetype,
+                            current_app.config.get('BATCH_MAX_ITEMS', 10000))
+        operation = {'POST': create_jobs, 'PUT': update_jobs, 'DELETE': delete_jobs}[request.method]
+        results = operation(items)
+        db.session.commit()
+        
+        succeeded = sum(1 for result in results if result['status'] != 'error')
+        if succeeded:
+            jobs_changed.send(current_app._get_current_object())
+        
+        return jsonify({
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded,
+            'results': results
+        }), 200
+        
+    except BatchError as e:
+        return jsonify({'error': str(e)}), 400
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'Batch conflicts with existing jobs'}), 409
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error processing job batch: {e}")
+        return jsonify({'error': 'Failed to process batch'}), 500
+
 @api_bp.route('/jobs/<int:job_id>', methods=['DELETE'])
 def delete_job(job_id):
     """Delete a job listing"""
@@ -82,6 +256,7 @@ def delete_job(job_id):
         job = Job.query.get_or_404(job_id)
         db.session.delete(job)
         db.session.commit()
+        jobs_changed.send(current_app._get_current_object())
         return jsonify({'message': 'Job deleted successfully'}), 200
     except Exception as e:
         logger.error(f"Error deleting job {job_id}: {e}")
@@ -95,17 +270,20 @@ def update_job(job_id):
         data = request.get_json()
         
         # Update fields if provided
-        for field in ['title', 'company', 'location', 'description', 'salary', 
-                     'job_type', 'experience_level', 'application_url']:
+        for field in Job.EDITABLE_FIELDS:
             if field in data:
                 setattr(job, field, data[field])
         
         db.session.commit()
+        jobs_changed.send(current_app._get_current_object())
         return jsonify({
             'message': 'Job updated successfully',
             'job': job.to_dict()
         }), 200
         
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'A job with this title, company and location already exists'}), 409
     except Exception as e:
         logger.error(f"Error updating job {job_id}: {e}")
         return jsonify({'error': 'Failed to update job'}), 500
@@ -114,31 +292,12 @@ def update_job(job_id):
 def get_stats():
     """Get job statistics"""
     try:
-        total_jobs = Job.query.count()
-        scraped_jobs = Job.query.filter_by(scraped=True).count()
-        
-        # Get top companies and locations efficiently
-        top_companies = db.session.query(
-            Job.company, 
-            db.func.count(Job.id).label('count')
-        ).group_by(Job.company).order_by(
-            db.func.count(Job.id).desc()
-        ).limit(5).all()
-        
-        top_locations = db.session.query(
-            Job.location, 
-            db.func.count(Job.id).label('count')
-        ).group_by(Job.location).order_by(
-            db.func.count(Job.id).desc()
-        ).limit(5).all()
+        try:
+            top = max(1, min(int(request.args.get('top', 5)), 50))
+        except ValueError:
+            return jsonify({'error': 'top must be an integer'}), 400
         
-        return jsonify({
-            'total_jobs': total_jobs,
-            'scraped_jobs': scraped_jobs,
-            'manual_jobs': total_jobs - scraped_jobs,
-            'top_companies': [{'name': c[0], 'count': c[1]} for c in top_companies],
-            'top_locations': [{'name': l[0], 'count': l[1]} for l in top_locations]
-        })
+        return jsonify(stats.get_stats(top, ttl=current_app.config.get('STATS_CACHE_TTL', 5.0)))
         
     except Exception as e:
         logger.error(f"Error fetching stats: {e}")
@@ -146,58 +305,45 @@ def get_stats():
 
 @api_bp.route('/scrape', methods=['GET', 'POST'])
 def trigger_scraping():
-    """Trigger LinkedIn job scraping"""
-    scraper = None
+    """Queue a LinkedIn scrape and return its task id, or its result if it finishes within wait seconds"""
     try:
-        from selenium_scraper import JobScraper
-        
-        logger.info("Starting job scraping")
-        scraper = JobScraper(headless=True)
-        scraped_jobs = scraper.scrape_jobs()
+        try:
+            queries, max_pages, wait = scrape_params(request.get_json(silent=True) or {},
+                                                     request.args, current_app.config)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        added_count = 0
-        for job_data in scraped_jobs:
-            try:
-                # Check for existing job
-                if not Job.query.filter(
-                    db.and_(
-                        Job.title.ilike(job_data['title']),
-                        Job.company.ilike(job_data['company'])
-                    )
-                ).first():
-                    new_job = Job(
-                        title=job_data['title'],
-                        company=job_data['company'],
-                        location=job_data.get('location', 'Not specified'),
-                        description=job_data.get('description', ''),
-                        salary=job_data.get('salary', ''),
-                        job_type=job_data.get('job_type', 'Full-time'),
-                        experience_level=job_data.get('experience_level', 'Not specified'),
-                        application_url=job_data.get('application_url', ''),
-                        scraped=True,
-                        posted_date=datetime.utcnow()
-                    )
-                    db.session.add(new_job)
-                    added_count += 1
-            except Exception as e:
-                logger.error(f"Error processing job: {e}")
-                continue
-        
-        db.session.commit()
+        task, created = current_app.extensions['scrape_queue'].submit(queries, max_pages)
+        if wait and not task.done:
+            futures.wait([task.future], timeout=wait)
         
-        return jsonify({
-            'message': f'Successfully scraped jobs. Added {added_count} new jobs.',
-            'total_scraped': len(scraped_jobs),
-            'added': added_count,
-            'jobs': [job.to_dict() for job in Job.query.filter_by(scraped=True).order_by(Job.posted_date.desc()).limit(5).all()]
-        }), 200
+        body, status = scrape_task_response(task, created)
+        status_url = url_for('api.get_scrape_task', task_id=task.id)
+        response = jsonify({**body, 'status_url': status_url})
+        response.headers['Location'] = status_url
+        return response, status
         
     except Exception as e:
-        logger.error(f"Error during scraping: {e}")
+        logger.error(f"Error queuing scraping: {e}")
         return jsonify({'error': str(e)}), 500
-    finally:
-        if scraper:
-            scraper.close()
+
+@api_bp.route('/scrape/<task_id>', methods=['GET'])
+def get_scrape_task(task_id):
+    """Get the status and result of a scrape task"""
+    task = current_app.extensions['scrape_queue'].get(task_id)
+    if task is None:
+        return jsonify({'error': 'Task not found'}), 404
+    return jsonify(task.to_dict())
+
+@api_bp.route('/schedule', methods=['GET'])
+def get_schedule():
+    """Scheduled scrapes and retention policy, with their last runs"""
+    return jsonify(current_app.extensions['scrape_scheduler'].to_dict())
+
+@api_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Request, SQL and scraper metrics in the Prometheus text format"""
+    return Response(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 @api_bp.route('/health', methods=['GET'])
 def health_check():
@@ -0,0 +1,180 @@
+import re
+import json
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from scrape_queue import scrape_params
+from retention import expire_jobs
+from signals import jobs_changed
+
+logger = logging.getLogger(__name__)
+
+_INTERVAL_RE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*$', re.IGNORECASE)
+_INTERVAL_UNITS = {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_interval(value):
+    """Seconds of an interval given as a number or a string like '90', '30m', '6h' or '1d'"""
+    if isinstance(value, (int, float)):
+        seconds = float(value)
+    else:
+        match = _INTERVAL_RE.match(str(value or ''))
+        if match is None:
+            raise ValueError(f'Invalid interval {value!r}, expected seconds or a number with s, m, h or d')
+        seconds = float(match.group(1)) * _INTERVAL_UNITS[match.group(2).lower()]
+    if seconds <= 0:
+        raise ValueError(f'Interval {value!r} must be positive')
+    return seconds
+
+
+class ScheduledScrape:
+    """A scrape submitted to the scrape queue every interval seconds"""
+
+    def __init__(self, queries, max_pages, interval):
+        self.queries = queries
+        self.max_pages = max_pages
+        self.interval = interval
+        self.next_run = time.monotonic()
+        self.last_run_at = None
+        self.last_task_id = None
+
+    @classmethod
+    def from_config(cls, entry, config):
+        """Build a scrape from a SCRAPE_SCHEDULE entry, which takes the
+        parameters of POST /api/scrape plus its interval in 'every'"""
+        queries, max_pages, _ = scrape_params(entry, {}, config)
+        return cls(queries, max_pages, parse_interval(entry.get('every')))
+
+    def to_dict(self):
+        """Convert the scheduled scrape to a dictionary"""
+        return {
+            'queries': [{'search_term': t, 'location': l} for t, l in self.queries],
+            'max_pages': self.max_pages,
+            'every': self.interval,
+            'next_run_in': max(0.0, round(self.next_run - time.monotonic(), 1)),
+            'last_run_at': self.last_run_at.isoformat() if self.last_run_at else None,
+            'last_task_id': self.last_task_id
+        }
+
+
+def load_schedule(config):
+    """The scheduled scrapes of SCRAPE_SCHEDULE, a JSON list (or list) of entries"""
+    entries = config.get('SCRAPE_SCHEDULE') or []
+    if isinstance(entries, str):
+        entries = json.loads(entries) if entries.strip() else []
+    return [ScheduledScrape.from_config(entry, config) for entry in entries]
+
+
+class ScrapeScheduler:
+    """Runs the SCRAPE_SCHEDULE scrapes and the retention policy periodically.
+
+    A daemon thread wakes every tick seconds, submits the scrapes that are
+    due to the scrape queue, which coalesces them with identical running
+    scrapes, and every RETENTION_INTERVAL seconds expires jobs older than
+    RETENTION_MAX_AGE_DAYS. The scheduler must run in a single process:
+    start() it from the development server or `flask run-scheduler`, not
+    from every worker of a multi-process server.
+    """
+
+    def __init__(self, app=None, tick=30.0):
+        self.app = None
+        self.tick = tick
+        self.scrapes = []
+        self.retention_interval = 3600.0
+        self.next_retention = None
+        self.last_retention = None
+        self._thread = None
+        self._stop = threading.Event()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register the scheduler on the app, configured from the SCHEDULER_* and RETENTION_* settings"""
+        self.app = app
+        self.tick = app.config.get('SCHEDULER_TICK', self.tick)
+        self.scrapes = load_schedule(app.config)
+        self.retention_interval = app.config.get('RETENTION_INTERVAL', self.retention_interval)
+        if self.retention_enabled:
+            self.next_retention = time.monotonic()
+        app.extensions['scrape_scheduler'] = self
+
+    @property
+    def retention_enabled(self):
+        return bool(self.app and self.app.config.get('RETENTION_MAX_AGE_DAYS'))
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the scheduler thread, unless it is running"""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='scrape-scheduler', daemon=True)
+        self._thread.start()
+        logger.info(f"Scheduler started with {len(self.scrapes)} scheduled scrapes, "
+                    f"retention {'enabled' if self.retention_enabled else 'disabled'}")
+
+    def stop(self, timeout=None):
+        """Stop the scheduler thread after its current pass"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run_pending(self):
+        """Submit the scrapes that are due and run retention if it is due"""
+        now = time.monotonic()
+        queue = self.app.extensions['scrape_queue']
+        for scrape in self.scrapes:
+            if scrape.next_run > now:
+                continue
+            task, _ = queue.submit(scrape.queries, scrape.max_pages)
+            scrape.last_task_id = task.id
+            scrape.last_run_at = datetime.utcnow()
+            scrape.next_run = now + scrape.interval
+
+        if self.next_retention is not None and self.next_retention <= now:
+            self.next_retention = now + self.retention_interval
+            self.last_retention = self.run_retention()
+
+    def run_retention(self, dry_run=False):
+        """Expire jobs according to the RETENTION_* settings, returning the summary"""
+        config = self.app.config
+        with self.app.app_context():
+            result = expire_jobs(timedelta(days=config['RETENTION_MAX_AGE_DAYS']),
+                                 mode=config.get('RETENTION_MODE', 'archive'),
+                                 scraped_only=config.get('RETENTION_SCRAPED_ONLY', True),
+                                 batch_size=config.get('RETENTION_BATCH_SIZE', 500),
+                                 dry_run=dry_run)
+            if result['expired'] and not dry_run:
+                jobs_changed.send(self.app)
+                seen_jobs = self.app.extensions['scrape_queue'].seen_jobs
+                if seen_jobs is not None:
+                    seen_jobs.invalidate()
+        return {**result, 'ran_at': datetime.utcnow().isoformat()}
+
+    def to_dict(self):
+        """Convert the scheduler state to a dictionary"""
+        return {
+            'running': self.running,
+            'tick': self.tick,
+            'scrapes': [scrape.to_dict() for scrape in self.scrapes],
+            'retention': {
+                'enabled': self.retention_enabled,
+                'max_age_days': self.app.config.get('RETENTION_MAX_AGE_DAYS') if self.app else None,
+                'mode': self.app.config.get('RETENTION_MODE') if self.app else None,
+                'every': self.retention_interval,
+                'last_run': self.last_retention
+            }
+        }
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_pending()
+            except Exception as e:
+                logger.error(f"Error in scheduler pass: {e}")
+            self._stop.wait(self.tick)
@@ -0,0 +1,206 @@
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import ExitStack
+from models import make_dedup_key
+from scrape_metrics import StageTimer, SCRAPE_PACING_SCALE
+
+logger = logging.getLogger(__name__)
+
+
+class HostRateLimiter:
+    """Spaces out requests to the same host by at least min_interval seconds"""
+
+    def __init__(self, min_interval=1.0):
+        self.min_interval = min_interval
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host):
+        """Block until the next request slot for host"""
+        interval = self.min_interval * self.pace(host)
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def pace(self, host):
+        """Multiplier for the scraper's own delays on host; fixed pacing never changes it"""
+        return 1.0
+
+    def record(self, host, blocked):
+        """Report the outcome of a page load on host"""
+
+
+class AdaptiveRateLimiter(HostRateLimiter):
+    """HostRateLimiter whose spacing and delays follow how a host responds.
+
+    Each host has a pace multiplier applied to min_interval and to the
+    scraper's settle and per-card delays. Healthy pages shrink it by
+    speedup, down to floor; a page that looks blocked (rate limited or
+    redirected to a login wall) multiplies it by backoff, up to ceiling.
+    """
+
+    def __init__(self, min_interval=1.0, floor=0.1, ceiling=10.0, speedup=0.9, backoff=2.0):
+        super().__init__(min_interval)
+        self.floor = floor
+        self.ceiling = ceiling
+        self.speedup = speedup
+        self.backoff = backoff
+        self._pace = {}
+
+    def pace(self, host):
+        with self._lock:
+            return self._pace.get(host, 1.0)
+
+    def record(self, host, blocked):
+        with self._lock:
+            pace = self._pace.get(host, 1.0)
+            if blocked:
+                pace = min(self.ceiling, pace * self.backoff)
+                # Push the next slot out so in-flight workers back off too
+                self._next_slot[host] = max(self._next_slot.get(host, 0.0),
+                                            time.monotonic() + self.min_interval * pace)
+            else:
+                pace = max(self.floor, pace * self.speedup)
+            self._pace[host] = pace
+        SCRAPE_PACING_SCALE.set(pace, host=host)
+
+
+class ScrapeEngine:
+    """Fans (search_term, location, page) units out across a worker pool.
+
+    The 'http' backend fetches pages without a browser and only falls back
+    to Selenium when that fails; the 'selenium' backend always uses Chrome.
+    Browsers are leased from the driver pool when one is given, so the
+    number of concurrent Chrome instances stays bounded by the pool size.
+    Results of every unit are merged, deduplicated and ranked. Time spent
+    in each scraper stage is collected in timer, one per run.
+
+    With seen, a filter of stored listings, known cards are skipped and a
+    query stops paging after a page where at least stop_ratio of the cards
+    were already stored; skipped_seen counts the cards skipped in a run.
+    Each query's pages are then scraped one after another, so the next
+    page is only requested once the previous one has been checked, while
+    different queries still run in parallel. Without seen all pages are
+    scraped in parallel and a query only stops at an empty page.
+    """
+
+    def __init__(self, driver_pool=None, workers=2, rate_limiter=None, page_limit=25, backend='http',
+                 seen=None, stop_ratio=0.8):
+        self.driver_pool = driver_pool
+        self.backend = backend
+        self.workers = workers
+        self.rate_limiter = rate_limiter or HostRateLimiter()
+        self.page_limit = page_limit
+        self.seen = seen
+        self.stop_ratio = stop_ratio
+        self.timer = StageTimer()
+        self.skipped_seen = 0
+
+    def run(self, queries, pages=range(1)):
+        """Scrape every page of every (search_term, location) query"""
+        self.timer = StageTimer()
+        self.skipped_seen = 0
+        pages = sorted(pages)
+        # Pages of each query still to scrape, in order
+        remaining = {(term, location): list(pages) for term, location in queries}
+        remaining = {query: query_pages for query, query_pages in remaining.items() if query_pages}
+        if not remaining:
+            return []
+        # Pages of a query in flight at once; one when each page decides whether to go on
+        depth = 1 if self.seen is not None else len(pages)
+
+        def scrape_unit(term, location, page):
+            jobs, scraper = self._scrape_page(term, location, page)
+            mostly_seen = scraper.page_cards and scraper.page_seen >= self.stop_ratio * scraper.page_cards
+            if mostly_seen and jobs:
+                logger.info(f"Page {page} of '{term}' in '{location}' is mostly stored listings, "
+                            f"not paging further")
+            return jobs, scraper.page_seen, not jobs or mostly_seen
+
+        results = []
+        scraped_pages = 0
+        with ThreadPoolExecutor(max_workers=min(self.workers, sum(map(len, remaining.values()))),
+                                thread_name_prefix='scrape-engine') as executor:
+            futures = {}
+
+            def submit_next(query):
+                query_pages = remaining.get(query)
+                if query_pages:
+                    page = query_pages.pop(0)
+                    futures[executor.submit(scrape_unit, *query, page)] = (query, page)
+
+            for query in remaining:
+                for _ in range(depth):
+                    submit_next(query)
+
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    query, page = futures.pop(future)
+                    term, location = query
+                    scraped_pages += 1
+                    try:
+                        jobs, page_seen, exhausted = future.result()
+                    except Exception as e:
+                        logger.error(f"Error scraping page {page} of '{term}' in '{location}': {e}")
+                        submit_next(query)
+                        continue
+                    results.extend(jobs)
+                    self.skipped_seen += page_seen
+                    if exhausted:
+                        # Later pages of this query are not scraped
+                        remaining.pop(query, None)
+                    else:
+                        submit_next(query)
+
+        merged = self._merge(results)
+        logger.info(f"Scraped {len(merged)} unique jobs from {scraped_pages} pages")
+        return merged
+
+    def _scrape_page(self, term, location, page):
+        """Scrape one page, returning its jobs and the scraper that read it"""
+        from selenium_scraper import JobScraper
+
+        if self.backend == 'http':
+            from http_scraper import HttpJobScraper
+
+            scraper = HttpJobScraper(
+                rate_limiter=self.rate_limiter,
+                driver_lease=self.driver_pool.lease if self.driver_pool is not None else None,
+                timer=self.timer,
+                seen=self.seen
+            )
+            try:
+                return scraper.scrape_linkedin_page(term, location, page, self.page_limit), scraper
+            finally:
+                scraper.close()
+
+        if self.driver_pool is not None:
+            with ExitStack() as stack:
+                with self.timer.stage('driver_lease'):
+                    driver = stack.enter_context(self.driver_pool.lease())
+                scraper = JobScraper(driver=driver, rate_limiter=self.rate_limiter, card_delay=0,
+                                     timer=self.timer, seen=self.seen)
+                return scraper.scrape_linkedin_page(term, location, page, self.page_limit), scraper
+
+        scraper = JobScraper(headless=True, rate_limiter=self.rate_limiter, card_delay=0,
+                             timer=self.timer, seen=self.seen)
+        try:
+            return scraper.scrape_linkedin_page(term, location, page, self.page_limit), scraper
+        finally:
+            scraper.close()
+
+    def _merge(self, jobs):
+        """Drop duplicate listings and rank the rest"""
+        from selenium_scraper import JobScraper
+
+        unique = {}
+        for job in jobs:
+            key = make_dedup_key(job.get('title'), job.get('company'), job.get('location'))
+            unique.setdefault(key, job)
+        return JobScraper.rank_jobs(list(unique.values()))
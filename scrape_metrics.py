@@ -0,0 +1,70 @@
+import time
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from metrics import registry
+
+SCRAPE_STAGE_SECONDS = registry.histogram(
+    'scrape_stage_duration_seconds', 'Time spent per scraper stage', ('stage',),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 20.0, 30.0))
+SCRAPE_PAGES = registry.counter(
+    'scrape_pages_total', 'Search result pages scraped, by outcome', ('outcome',))
+SCRAPE_CARDS = registry.counter(
+    'scrape_cards_total', 'Complete job cards found on result pages, new or already stored', ('outcome',))
+SCRAPE_PACING_SCALE = registry.gauge(
+    'scrape_pacing_scale', 'Current adaptive delay multiplier per host', ('host',))
+
+
+class StageTimer:
+    """Accumulates the time a scrape run spends in each stage.
+
+    Stages are driver_lease, driver_start, rate_limit, navigate,
+    settle_sleep, card_wait, extract (which includes card_sleep),
+    scroll_sleep, http_fetch and http_parse. Every measurement is also
+    recorded in the scrape_stage_duration_seconds metric. Safe to share
+    between the threads of one run.
+    """
+
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.counts = Counter()
+        self.pages = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        SCRAPE_STAGE_SECONDS.observe(seconds, stage=stage)
+        with self._lock:
+            self.seconds[stage] += seconds
+            self.counts[stage] += 1
+
+    @contextmanager
+    def stage(self, name):
+        """Time the block as one occurrence of a stage"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def sleep(self, seconds, stage='sleep'):
+        """Sleep, recording the time under stage"""
+        if seconds <= 0:
+            return
+        with self.stage(stage):
+            time.sleep(seconds)
+
+    def page(self, outcome):
+        """Count a scraped page as ok, empty, blocked or error"""
+        SCRAPE_PAGES.inc(outcome=outcome)
+        with self._lock:
+            self.pages[outcome] += 1
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'stages': {
+                    stage: {'seconds': round(seconds, 3), 'count': self.counts[stage]}
+                    for stage, seconds in sorted(self.seconds.items(), key=lambda item: -item[1])
+                },
+                'pages': dict(self.pages),
+            }
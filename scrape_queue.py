@@ -0,0 +1,226 @@
+import json
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import current_app
+from database import db
+from models import Job
+from ingest import upsert_scraped_jobs
+from signals import jobs_changed
+from scrape_engine import ScrapeEngine, HostRateLimiter, AdaptiveRateLimiter
+from seen_jobs import SeenJobs
+
+logger = logging.getLogger(__name__)
+
+
+class ScrapeTask:
+    """A queued scrape of one or more (search_term, location) queries"""
+
+    def __init__(self, queries, max_pages=1):
+        self.id = uuid.uuid4().hex
+        self.queries = [(term, location) for term, location in queries]
+        self.max_pages = max_pages
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.created_at = datetime.utcnow()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+
+    @property
+    def key(self):
+        """Identity used to coalesce concurrent requests for the same search"""
+        normalized = sorted({(t.strip().lower(), l.strip().lower()) for t, l in self.queries})
+        return (tuple(normalized), self.max_pages)
+
+    @property
+    def done(self):
+        return self.status in ('completed', 'failed')
+
+    def to_dict(self):
+        """Convert task to dictionary"""
+        return {
+            'task_id': self.id,
+            'status': self.status,
+            'queries': [{'search_term': t, 'location': l} for t, l in self.queries],
+            'max_pages': self.max_pages,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'result': self.result,
+            'error': self.error
+        }
+
+
+def make_rate_limiter(config):
+    """Build the rate limiter selected by SCRAPE_PACING ('fixed' or 'adaptive')"""
+    interval = config.get('SCRAPE_HOST_INTERVAL', 1.0)
+    if config.get('SCRAPE_PACING', 'fixed') == 'adaptive':
+        return AdaptiveRateLimiter(interval, floor=config.get('SCRAPE_PACE_FLOOR', 0.1),
+                                   ceiling=config.get('SCRAPE_PACE_CEILING', 10.0))
+    return HostRateLimiter(interval)
+
+
+def scrape_params(data, args, config):
+    """Read the queries, page count and wait time of a scrape request.
+
+    Raises ValueError for a body that is not an object, malformed queries
+    or a malformed pages or wait parameter.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Request body must be a JSON object')
+    # Either a list of queries or a single search_term/location
+    if data.get('queries'):
+        if not isinstance(data['queries'], list) or not all(isinstance(q, dict) for q in data['queries']):
+            raise ValueError('queries must be a list of objects')
+        queries = [(q.get('search_term') or 'software engineer', q.get('location') or '')
+                   for q in data['queries']]
+    else:
+        queries = [(data.get('search_term') or args.get('search_term') or 'software engineer',
+                    data.get('location') or args.get('location') or '')]
+    if not all(isinstance(term, str) and isinstance(location, str) for term, location in queries):
+        raise ValueError('search_term and location must be strings')
+
+    try:
+        max_pages = int(data.get('pages') or args.get('pages') or 1)
+    except (TypeError, ValueError):
+        raise ValueError('pages must be an integer')
+    max_pages = max(1, min(max_pages, config.get('SCRAPE_MAX_PAGES', 10)))
+
+    try:
+        wait = float(data.get('wait') or args.get('wait') or 0)
+    except (TypeError, ValueError):
+        raise ValueError('wait must be a number of seconds')
+    wait = max(0.0, min(wait, config.get('SCRAPE_MAX_WAIT', 120.0)))
+    return queries, max_pages, wait
+
+
+class ScrapeQueue:
+    """Runs scrapes in a bounded background worker pool.
+
+    Each worker drives one browser, so max_workers also caps the number of
+    concurrent Chrome instances. Requests for a search that is already
+    queued or running return the existing task instead of starting another.
+    """
+
+    def __init__(self, app=None, max_workers=2, max_history=100):
+        self.max_workers = max_workers
+        self.max_history = max_history
+        self.app = None
+        self._executor = None
+        self._tasks = OrderedDict()
+        self._active = {}
+        self._lock = threading.Lock()
+        self.rate_limiter = HostRateLimiter()
+        self.seen_jobs = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Register the queue on the app, sized from SCRAPE_WORKERS"""
+        self.app = app
+        self.max_workers = app.config.get('SCRAPE_WORKERS', self.max_workers)
+        self.rate_limiter = make_rate_limiter(app.config)
+        if app.config.get('SCRAPE_INCREMENTAL', True):
+            self.seen_jobs = SeenJobs(error_rate=app.config.get('SCRAPE_SEEN_ERROR_RATE', 0.001),
+                                      max_age=app.config.get('SCRAPE_SEEN_MAX_AGE', 3600))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix='scrape-worker')
+        app.extensions['scrape_queue'] = self
+
+    def submit(self, queries, max_pages=1):
+        """Enqueue a scrape of (search_term, location) queries, returning (task, created)"""
+        task = ScrapeTask(queries, max_pages)
+        with self._lock:
+            active = self._active.get(task.key)
+            if active is not None:
+                return active, False
+
+            self._tasks[task.id] = task
+            self._active[task.key] = task
+            self._prune()
+            task.future = self._executor.submit(self._run, task)
+
+        logger.info(f"Queued scrape task {task.id} for {len(task.queries)} queries, {max_pages} pages each")
+        return task, True
+
+    def get(self, task_id):
+        """Look up a task by id"""
+        with self._lock:
+            return self._tasks.get(task_id)
+
+    def shutdown(self, wait=True):
+        """Stop accepting work and wait for running scrapes"""
+        if self._executor:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _prune(self):
+        """Drop the oldest finished tasks beyond max_history"""
+        finished = [t.id for t in self._tasks.values() if t.done]
+        for task_id in finished[:max(0, len(self._tasks) - self.max_history)]:
+            del self._tasks[task_id]
+
+    def _run(self, task):
+        """Scrape and ingest in a worker thread"""
+        task.status = 'running'
+        task.started_at = datetime.utcnow()
+        try:
+            with self.app.app_context():
+                task.result = run_scrape(task.queries, task.max_pages, self.rate_limiter, self.seen_jobs)
+            task.status = 'completed'
+        except Exception as e:
+            logger.error(f"Error during scraping task {task.id}: {e}")
+            task.error = str(e)
+            task.status = 'failed'
+        finally:
+            task.finished_at = datetime.utcnow()
+            with self._lock:
+                if self._active.get(task.key) is task:
+                    del self._active[task.key]
+
+
+def run_scrape(queries, max_pages=1, rate_limiter=None, seen_jobs=None):
+    """Scrape LinkedIn for every query and ingest the results, returning a summary.
+
+    With seen_jobs, cards of listings already stored are skipped and
+    queries stop paging once their results are mostly known.
+    """
+    try:
+        logger.info("Starting job scraping")
+        pool = current_app.extensions.get('driver_pool')
+        engine = ScrapeEngine(
+            driver_pool=pool,
+            workers=current_app.config.get('SCRAPE_ENGINE_WORKERS') or (pool.size if pool else 1),
+            rate_limiter=rate_limiter,
+            backend=current_app.config.get('SCRAPE_BACKEND', 'http'),
+            seen=seen_jobs.get() if seen_jobs is not None else None,
+            stop_ratio=current_app.config.get('SCRAPE_SEEN_STOP_RATIO', 0.8)
+        )
+        scraped_jobs = engine.run(queries, pages=range(max_pages))
+        timings = engine.timer.to_dict()
+        logger.info("Scrape timings: " + json.dumps(timings))
+
+        # Resolve duplicates for the whole batch at once
+        added_count, near_duplicates = upsert_scraped_jobs(
+            scraped_jobs, current_app.config.get('NEAR_DUPLICATE_THRESHOLD'))
+        db.session.commit()
+        jobs_changed.send(current_app._get_current_object())
+        if seen_jobs is not None:
+            seen_jobs.add_jobs(scraped_jobs)
+
+        return {
+            'message': f'Successfully scraped jobs. Added {added_count} new jobs.',
+            'total_scraped': len(scraped_jobs),
+            'added': added_count,
+            'skipped_seen': engine.skipped_seen,
+            'near_duplicates': near_duplicates,
+            'timings': timings,
+            'jobs': [job.to_dict() for job in Job.query.filter_by(scraped=True).order_by(Job.posted_date.desc()).limit(5).all()]
+        }
+    except Exception:
+        db.session.rollback()
+        raise
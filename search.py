@@ -0,0 +1,115 @@
+import re
+import logging
+from sqlalchemy.sql import table, column
+from database import db
+from models import Job
+
+logger = logging.getLogger(__name__)
+
+# Columns indexed for keyword search and their bm25 weights
+FTS_COLUMNS = ('title', 'company', 'location', 'description')
+FTS_WEIGHTS = (10.0, 5.0, 2.0, 1.0)
+
+jobs_fts = table('jobs_fts', column('rowid'), column('jobs_fts'))
+
+_FTS_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS jobs_fts USING fts5(
+        {', '.join(FTS_COLUMNS)},
+        content='jobs', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS jobs_fts_ai AFTER INSERT ON jobs BEGIN
+        INSERT INTO jobs_fts(rowid, {', '.join(FTS_COLUMNS)})
+        VALUES (new.id, {', '.join('new.' + c for c in FTS_COLUMNS)});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS jobs_fts_ad AFTER DELETE ON jobs BEGIN
+        INSERT INTO jobs_fts(jobs_fts, rowid, {', '.join(FTS_COLUMNS)})
+        VALUES ('delete', old.id, {', '.join('old.' + c for c in FTS_COLUMNS)});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS jobs_fts_au AFTER UPDATE OF {', '.join(FTS_COLUMNS)} ON jobs BEGIN
+        INSERT INTO jobs_fts(jobs_fts, rowid, {', '.join(FTS_COLUMNS)})
+        VALUES ('delete', old.id, {', '.join('old.' + c for c in FTS_COLUMNS)});
+        INSERT INTO jobs_fts(rowid, {', '.join(FTS_COLUMNS)})
+        VALUES (new.id, {', '.join('new.' + c for c in FTS_COLUMNS)});
+    END""",
+]
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Engines that have a usable jobs_fts table, keyed by engine URL
+_fts_available = {}
+
+
+def init_search(engine):
+    """Create the FTS5 index and its sync triggers, backfilling it if new"""
+    if engine.dialect.name != 'sqlite':
+        return False
+
+    try:
+        with engine.begin() as conn:
+            exists = conn.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name='jobs_fts'"
+            ).first()
+            for statement in _FTS_SCHEMA:
+                conn.exec_driver_sql(statement)
+            if not exists:
+                conn.exec_driver_sql("INSERT INTO jobs_fts(jobs_fts) VALUES ('rebuild')")
+                logger.info("Built full-text search index for jobs")
+    except Exception as e:
+        logger.warning(f"Full-text search unavailable, falling back to LIKE: {e}")
+        _fts_available[str(engine.url)] = False
+        return False
+
+    _fts_available[str(engine.url)] = True
+    return True
+
+
+def fts_enabled(engine):
+    """Check (once per engine) whether the FTS5 index exists"""
+    key = str(engine.url)
+    if key not in _fts_available:
+        if engine.dialect.name != 'sqlite':
+            _fts_available[key] = False
+        else:
+            with engine.connect() as conn:
+                _fts_available[key] = conn.exec_driver_sql(
+                    "SELECT 1 FROM sqlite_master WHERE type='table' AND name='jobs_fts'"
+                ).first() is not None
+    return _fts_available[key]
+
+
+def tokenize(q):
+    """Split a free text query into search terms"""
+    return _TOKEN_RE.findall(q or '')
+
+
+def build_match_query(terms):
+    """Build an FTS5 MATCH expression requiring every term as a prefix"""
+    return ' '.join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+
+
+def apply_search(query, q, fts=None):
+    """Restrict a job query to rows matching q.
+
+    Returns the filtered query and a relevance expression (higher is more
+    relevant) usable as a sort key, or None when FTS5 is not available.
+    fts says whether the index exists, checked on the app's engine if None.
+    """
+    terms = tokenize(q)
+    if not terms:
+        return query, None
+
+    if fts is None:
+        fts = fts_enabled(db.engine)
+    if fts:
+        query = query.join(jobs_fts, jobs_fts.c.rowid == Job.id).filter(
+            jobs_fts.c.jobs_fts.op('MATCH')(build_match_query(terms))
+        )
+        relevance = -db.func.bm25(jobs_fts.c.jobs_fts, *FTS_WEIGHTS)
+        return query, relevance
+
+    # Fallback for databases without FTS5: every term must appear somewhere
+    for term in terms:
+        pattern = f"%{term}%"
+        query = query.filter(db.or_(*[getattr(Job, c).ilike(pattern) for c in FTS_COLUMNS]))
+    return query, None
@@ -0,0 +1,166 @@
+import re
+import math
+import time
+import hashlib
+import logging
+import threading
+from urllib.parse import urlsplit
+from database import db
+from models import Job, make_dedup_key
+from table_version import read_version
+
+logger = logging.getLogger(__name__)
+
+# Numeric listing id in LinkedIn job URLs such as /jobs/view/backend-engineer-at-acme-3812345678
+LINKEDIN_JOB_ID_RE = re.compile(r'/jobs/view/(?:[^/?#]*-)?(\d+)')
+
+# Rows fetched per round trip while loading the filter
+LOAD_BATCH_SIZE = 10000
+
+# Smallest filter built, so an empty table still has room for a few scrapes
+MIN_CAPACITY = 10000
+
+
+def url_key(url):
+    """Hash identifying the listing an application URL points to, or None.
+
+    Tracking parameters are ignored, and LinkedIn URLs are keyed by their
+    listing id alone, as the slug before it changes with the title.
+    """
+    if not url:
+        return None
+    match = LINKEDIN_JOB_ID_RE.search(url)
+    if match:
+        canonical = f'linkedin:{match.group(1)}'
+    else:
+        parts = urlsplit(url)
+        if not parts.netloc:
+            return None
+        canonical = f"{parts.netloc.lower()}{parts.path.rstrip('/')}"
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+class BloomFilter:
+    """Set membership of sha1 hex digests in a fixed-size bit array.
+
+    Lookups may report false positives at about error_rate once capacity
+    keys are added, never false negatives. Bit positions are derived from
+    the digest itself by double hashing, so keys are not hashed again.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(8, int(math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.size / self.capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        h1 = int(key[:16], 16)
+        h2 = int(key[16:32], 16) | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hashes)]
+
+    def add(self, key):
+        bits = self.bits
+        for position in self._positions(key):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def full(self):
+        return self.count >= self.capacity
+
+
+class SeenJobs:
+    """Bloom filter of the listings already stored in the jobs table.
+
+    Each job is added under its dedup key and, when it has one, the key of
+    its application URL, so scrapers can skip cards that are already
+    stored before extracting them. The filter is built from the table on
+    first use and rebuilt once it is max_age seconds old or full; jobs
+    ingested in between are added as they are stored. Deletes by any
+    process, e.g. the retention policy or a CLI command, also trigger a
+    rebuild where the shared jobs_version counters are maintained (see
+    table_version); elsewhere deleted jobs stay in the filter until the
+    next rebuild. A false positive only means a new card is skipped until
+    then, at about error_rate.
+    """
+
+    def __init__(self, error_rate=0.001, max_age=3600, headroom=1.5):
+        self.error_rate = error_rate
+        self.max_age = max_age
+        self.headroom = headroom
+        self._filter = None
+        self._built_at = 0.0
+        self._deletes = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """The current filter, rebuilding it when stale. Needs an app context."""
+        version = read_version()
+        deletes = version[1] if version else None
+        with self._lock:
+            if (self._filter is None or self._filter.full
+                    or time.monotonic() - self._built_at > self.max_age
+                    or deletes != self._deletes):
+                self._filter = self._build()
+                self._built_at = time.monotonic()
+                self._deletes = deletes
+            return self._filter
+
+    def invalidate(self):
+        with self._lock:
+            self._filter = None
+
+    def add_jobs(self, jobs):
+        """Add freshly ingested job data to the current filter"""
+        with self._lock:
+            seen = self._filter
+            if seen is None:
+                return
+            for job in jobs:
+                for key in job_keys(job):
+                    seen.add(key)
+
+    def _build(self):
+        started = time.perf_counter()
+        total = db.session.query(db.func.count(Job.id)).scalar() or 0
+        seen = BloomFilter(max(MIN_CAPACITY, int(total * 2 * self.headroom)), self.error_rate)
+        rows = db.session.execute(
+            db.select(Job.dedup_key, Job.application_url).execution_options(yield_per=LOAD_BATCH_SIZE)
+        )
+        for dedup_key, application_url in rows:
+            if dedup_key:
+                seen.add(dedup_key)
+            key = url_key(application_url)
+            if key:
+                seen.add(key)
+        db.session.commit()
+        logger.info(f"Loaded {total} stored jobs into a {len(seen.bits) // 1024}KB seen-jobs filter "
+                    f"in {time.perf_counter() - started:.2f}s")
+        return seen
+
+
+def job_keys(job):
+    """Keys a scraped card or job dict is looked up under"""
+    keys = []
+    if job.get('title') and job.get('company'):
+        keys.append(make_dedup_key(job['title'], job['company'], job.get('location') or 'Location Not Specified'))
+    key = url_key(job.get('application_url'))
+    if key:
+        keys.append(key)
+    return keys
+
+
+def is_seen(seen, job):
+    """Whether any key of a card is in the filter"""
+    return any(key in seen for key in job_keys(job))
@@ -7,7 +7,11 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
 import logging
+from urllib.parse import quote, urlsplit
 from fake_useragent import UserAgent
+from scrape_metrics import StageTimer, SCRAPE_CARDS
+from seen_jobs import is_seen
+from enrichment import enrich_jobs, PLACEHOLDER_DESCRIPTION
 
 logging.basicConfig(
     level=logging.INFO,
@@ -15,54 +19,166 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+LINKEDIN_BASE_URL = "https://www.linkedin.com"
+
+# Results per LinkedIn search page
+LINKEDIN_PAGE_SIZE = 25
+
+# Selectors matching job cards on a search results page, tried in order
+CARD_SELECTORS = [
+    '.jobs-search__results-list > li',
+    '.job-search-card',
+    '.jobs-search-results__list-item'
+]
+
+# CSS selectors tried in order for each card field by the extraction script
+CARD_FIELD_SELECTORS = {
+    'title': ['h3.base-search-card__title', '.job-search-card__title'],
+    'company': ['h4.base-search-card__subtitle', '.job-search-card__company-name'],
+    'location': ['.job-search-card__location', 'span.job-search-card__location'],
+    'application_url': ['a.base-card__full-link', 'a.job-search-card__link'],
+    'posted_date': ['time.job-search-card__listdate', 'time.job-search-card__listdate--new', 'time'],
+    'salary': ['.job-search-card__salary-info']
+}
+
+# Fields read from an element attribute rather than its text
+CARD_FIELD_ATTRIBUTES = {
+    'application_url': 'href',
+    'posted_date': 'datetime'
+}
+
+# URL fragments of pages LinkedIn shows instead of results when it blocks a client
+BLOCKED_URL_MARKERS = ('/authwall', '/checkpoint', '/uas/login')
+
+# Reads every field of every card inside the page in a single round trip
+EXTRACT_CARDS_SCRIPT = """
+const [cards, selectors, attributes] = arguments;
+return cards.map(card => {
+    const data = {};
+    for (const [field, candidates] of Object.entries(selectors)) {
+        data[field] = '';
+        for (const selector of candidates) {
+            const el = card.querySelector(selector);
+            if (!el) continue;
+            const attr = attributes[field];
+            const value = attr ? (el[attr] || el.getAttribute(attr) || '') : (el.innerText || el.textContent || '');
+            data[field] = String(value).replace(/\\s+/g, ' ').trim();
+            if (data[field]) break;
+        }
+    }
+    return data;
+});
+"""
+
+_user_agent = None
+
+def is_blocked_url(url):
+    """Whether a page URL is a login wall or challenge rather than search results"""
+    return any(marker in (url or '') for marker in BLOCKED_URL_MARKERS)
+
+
+def random_user_agent():
+    """Random browser user agent, loading the UserAgent dataset only once"""
+    global _user_agent
+    if _user_agent is None:
+        _user_agent = UserAgent()
+    return _user_agent.random
+
+def create_driver(headless=True):
+    """Create a Chrome driver with anti-detection measures"""
+    chrome_options = Options()
+    
+    if headless:
+        chrome_options.add_argument("--headless=new")
+    
+    # Anti-detection settings
+    chrome_options.add_argument(f'user-agent={random_user_agent()}')
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    chrome_options.add_argument("--window-size=1920,1080")
+    chrome_options.add_argument("--start-maximized")
+    
+    # Additional stealth settings
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+    chrome_options.add_experimental_option('excludeSwitches', ['enable-logging'])
+    
+    prefs = {
+        "profile.default_content_setting_values.notifications": 2,
+        "credentials_enable_service": False,
+        "profile.password_manager_enabled": False,
+        "profile.managed_default_content_settings.images": 2
+    }
+    chrome_options.add_experimental_option("prefs", prefs)
+    
+    try:
+        driver = webdriver.Chrome(options=chrome_options)
+        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        driver.execute_script("window.navigator.chrome = { runtime: {} };")
+        driver.implicitly_wait(15)
+        logger.info("Chrome driver initialized successfully")
+        return driver
+    except Exception as e:
+        logger.error(f"Failed to initialize Chrome driver: {e}")
+        raise
+
 class JobScraper:
-    def __init__(self, headless=True):
+    def __init__(self, headless=True, driver=None, rate_limiter=None, card_delay=0.5, extraction='script',
+                 timer=None, seen=None):
+        """Use a leased driver if given, otherwise start a dedicated one.
+
+        extraction is 'script' to read all cards with one injected script, or
+        'elements' to query each card field through WebDriver. Stage timings
+        are collected in timer, a StageTimer shared by the scrape run. Cards
+        found in seen, a filter of stored listings, are skipped; page_cards
+        and page_seen count the cards of the last page and how many of them
+        were skipped.
+        """
         self.headless = headless
-        self.driver = None
-        self.setup_driver()
+        self.driver = driver
+        self.rate_limiter = rate_limiter
+        self.card_delay = card_delay
+        self.extraction = extraction
+        self.base_url = LINKEDIN_BASE_URL
+        self.timer = timer or StageTimer()
+        self.seen = seen
+        self.page_cards = 0
+        self.page_seen = 0
+        self._owns_driver = driver is None
+        if self._owns_driver:
+            self.setup_driver()
     
     def setup_driver(self):
         """Initialize Chrome driver with anti-detection measures"""
-        chrome_options = Options()
-        
-        if self.headless:
-            chrome_options.add_argument("--headless=new")
-        
-        # Anti-detection settings
-        ua = UserAgent()
-        chrome_options.add_argument(f'user-agent={ua.random}')
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_argument("--window-size=1920,1080")
-        chrome_options.add_argument("--start-maximized")
-        
-        # Additional stealth settings
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        chrome_options.add_experimental_option('excludeSwitches', ['enable-logging'])
-        
-        prefs = {
-            "profile.default_content_setting_values.notifications": 2,
-            "credentials_enable_service": False,
-            "profile.password_manager_enabled": False,
-            "profile.managed_default_content_settings.images": 2
-        }
-        chrome_options.add_experimental_option("prefs", prefs)
-        
-        try:
-            self.driver = webdriver.Chrome(options=chrome_options)
-            self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-            self.driver.execute_script("window.navigator.chrome = { runtime: {} };")
-            self.driver.implicitly_wait(15)
-            logger.info("Chrome driver initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize Chrome driver: {e}")
-            raise
+        with self.timer.stage('driver_start'):
+            self.driver = create_driver(self.headless)
+    
+    def human_like_delay(self, min_delay=2, max_delay=5, stage='sleep'):
+        """Add random delay to simulate human behavior, scaled by the host's pace"""
+        self.timer.sleep(random.uniform(min_delay, max_delay) * self._pace(), stage)
+    
+    def _pace(self):
+        """Delay multiplier of the rate limiter for the scraped host"""
+        if self.rate_limiter is None:
+            return 1.0
+        return self.rate_limiter.pace(urlsplit(self.base_url).netloc)
+    
+    def _skip_seen(self, card):
+        """Whether a card is already stored, counting it for the page"""
+        self.page_cards += 1
+        if self.seen is not None and is_seen(self.seen, card):
+            self.page_seen += 1
+            SCRAPE_CARDS.inc(outcome='seen')
+            return True
+        SCRAPE_CARDS.inc(outcome='new')
+        return False
     
-    def human_like_delay(self, min_delay=2, max_delay=5):
-        """Add random delay to simulate human behavior"""
-        time.sleep(random.uniform(min_delay, max_delay))
+    def _record_page(self, host, outcome):
+        """Count a page outcome and let the rate limiter adapt to it"""
+        self.timer.page(outcome)
+        if self.rate_limiter is not None and outcome in ('ok', 'blocked'):
+            self.rate_limiter.record(host, blocked=outcome == 'blocked')
     
     def scroll_page(self):
         """Simulate human-like scrolling behavior"""
@@ -75,23 +191,23 @@ class JobScraper:
                 scroll_amount = random.randint(100, 400)
                 current_position += scroll_amount
                 self.driver.execute_script(f"window.scrollTo(0, {current_position});")
-                self.human_like_delay(0.5, 1.5)
+                self.human_like_delay(0.5, 1.5, stage='scroll_sleep')
                 
                 if random.random() < 0.2:
                     current_position -= random.randint(50, 200)
                     self.driver.execute_script(f"window.scrollTo(0, {current_position});")
-                    self.human_like_delay(0.5, 1)
+                    self.human_like_delay(0.5, 1, stage='scroll_sleep')
             
             self.driver.execute_script("window.scrollTo(0, 0);")
-            self.human_like_delay(1, 2)
+            self.human_like_delay(1, 2, stage='scroll_sleep')
         except Exception as e:
             logger.warning(f"Error during scrolling: {e}")
     
-    def scrape_jobs(self, search_term="software engineer", location="", max_pages=1):
+    def scrape_jobs(self, search_term="software engineer", location="", max_pages=1, limit=5):
         """Main method to scrape jobs"""
         try:
             logger.info(f"Starting job scraping for: {search_term}")
-            jobs = self.scrape_linkedin_jobs(search_term, location, max_pages)
+            jobs = self.scrape_linkedin_jobs(search_term, location, max_pages, limit)
             
             if not jobs:
                 logger.warning("No jobs found on LinkedIn")
@@ -105,13 +221,7 @@ class JobScraper:
     
     def _find_linkedin_job_cards(self, limit=5):
         """Find LinkedIn job cards with limit"""
-        selectors = [
-            '.jobs-search__results-list > li',
-            '.job-search-card',
-            '.jobs-search-results__list-item'
-        ]
-        
-        for selector in selectors:
+        for selector in CARD_SELECTORS:
             try:
                 # Wait for at least 'limit' number of cards to be present
                 WebDriverWait(self.driver, 10).until(
@@ -127,9 +237,52 @@ class JobScraper:
         
         return None
 
+    def _extract_linkedin_jobs_script(self, cards):
+        """Extract job data from LinkedIn cards with a single injected script"""
+        raw_jobs = self.driver.execute_script(
+            EXTRACT_CARDS_SCRIPT, cards, CARD_FIELD_SELECTORS, CARD_FIELD_ATTRIBUTES
+        ) or []
+        return self._build_jobs(raw_jobs)
+    
+    def _build_jobs(self, raw_jobs):
+        """Turn raw card fields into job data, skipping incomplete cards"""
+        jobs = []
+        self.page_cards = self.page_seen = 0
+        for i, raw in enumerate(raw_jobs, 1):
+            if not (raw.get('title') and raw.get('company')):
+                continue
+            if self._skip_seen(raw):
+                continue
+            
+            jobs.append({
+                'title': raw['title'],
+                'company': raw['company'],
+                'location': raw.get('location') or "Location Not Specified",
+                'application_url': raw.get('application_url') or "",
+                'description': PLACEHOLDER_DESCRIPTION,
+                'job_type': "Full-time",
+                'salary': raw.get('salary') or "",
+                'posted_date': raw.get('posted_date') or ""
+            })
+            logger.info(f"Extracted job {i}: {raw['title']} at {raw['company']}")
+        
+        self._log_seen()
+        return enrich_jobs(jobs)
+    
+    def _log_seen(self):
+        if self.page_seen:
+            logger.info(f"Skipped {self.page_seen} of {self.page_cards} cards already stored")
+    
     def _extract_linkedin_jobs(self, cards):
         """Extract job data from LinkedIn cards"""
+        if self.extraction == 'script':
+            try:
+                return self._extract_linkedin_jobs_script(cards)
+            except WebDriverException as e:
+                logger.warning(f"Script extraction failed, falling back to per-element extraction: {e}")
+        
         jobs = []
+        self.page_cards = self.page_seen = 0
         for i, card in enumerate(cards, 1):
             try:
                 # Minimal scroll for just the current card
@@ -168,11 +321,14 @@ class JobScraper:
                 except:
                     job_data['application_url'] = ""
                 
+                # Known listings are skipped before reading anything else
+                if self._skip_seen(job_data):
+                    continue
+                
                 # Set default values for optional fields
                 job_data.update({
-                    'description': "Click the application URL to view the full job description on LinkedIn.",
+                    'description': PLACEHOLDER_DESCRIPTION,
                     'job_type': "Full-time",
-                    'experience_level': self._extract_experience_level(job_data['title']),
                     'salary': "",
                     'posted_date': ""
                 })
@@ -194,122 +350,105 @@ class JobScraper:
                 logger.info(f"Extracted job {i}: {job_data['title']} at {job_data['company']}")
                 
                 # Minimal delay between extractions
-                if i < len(cards):
-                    time.sleep(0.5)
+                if self.card_delay and i < len(cards):
+                    self.timer.sleep(self.card_delay * self._pace(), 'card_sleep')
                 
-        except Exception as e:
+            except Exception as e:
                 logger.warning(f"Error extracting job {i}: {e}")
                 continue
         
-        return jobs
+        self._log_seen()
+        return enrich_jobs(jobs)
     
-    def _get_job_priority_score(self, job):
-        """Calculate priority score for job sorting"""
-        score = 0
-        title_lower = job.get('title', '').lower()
+    def build_search_url(self, search_term, location="", page=0):
+        """Build the LinkedIn job search URL for a results page"""
+        search_encoded = quote(search_term)
+        location_encoded = quote(location) if location else "worldwide"
         
-        # Prioritize by experience level
-        if any(senior in title_lower for senior in ['senior', 'sr.', 'lead', 'principal', 'staff', 'architect']):
-            score += 5
-        elif any(mid in title_lower for mid in ['mid', 'intermediate', 'software engineer II']):
-            score += 3
-        elif any(junior in title_lower for junior in ['junior', 'jr.', 'entry', 'intern', 'internship']):
-            score -= 2
-            
-        # Penalize internships and temporary positions
-        if any(term in title_lower for term in ['intern', 'internship', 'temporary', 'contract']):
-            score -= 3
-            
-        # Boost for key technologies
-        tech_keywords = ['python', 'javascript', 'react', 'node', 'aws', 'cloud', 'full stack', 'fullstack']
-        score += sum(2 for tech in tech_keywords if tech in title_lower)
+        # Add filters to get most relevant results first
+        filters = [
+            'f_TPR=r86400',        # Last 24 hours
+            'f_JT=F',              # Full-time jobs only
+            'f_E=2%2C3%2C4',       # Mid-Senior level (2=Mid, 3=Senior, 4=Executive)
+            'sortBy=R',            # Most relevant first
+            'position=1',          # Start position
+            f'pageNum={page}',     # Results page
+            f'start={page * LINKEDIN_PAGE_SIZE}',
+            'f_AL=true'           # Easy apply jobs
+        ]
         
-        # Boost for remote positions
-        if 'remote' in job.get('location', '').lower():
-            score += 2
-            
-        return score
-
-    def _extract_experience_level(self, title):
-        """Extract experience level from job title"""
-        title_lower = title.lower()
+        return f"{self.base_url}/jobs/search/?keywords={search_encoded}&location={location_encoded}&{'&'.join(filters)}"
+    
+    def scrape_linkedin_page(self, search_term="software engineer", location="", page=0, limit=5):
+        """Scrape up to limit jobs from one LinkedIn results page"""
+        url = self.build_search_url(search_term, location, page)
+        host = urlsplit(url).netloc
         
-        # Senior level positions
-        if any(senior in title_lower for senior in ['senior', 'sr.', 'lead', 'principal', 'staff', 'architect']):
-            return 'Senior'
+        if self.rate_limiter:
+            with self.timer.stage('rate_limit'):
+                self.rate_limiter.wait(host)
+        logger.info(f"Accessing LinkedIn Jobs: {url}")
+        with self.timer.stage('navigate'):
+            self.driver.get(url)
         
-        # Mid level positions
-        elif any(mid in title_lower for mid in ['mid', 'intermediate', 'software engineer II', 'software engineer 2']):
-            return 'Mid'
+        if is_blocked_url(self.driver.current_url):
+            logger.warning(f"LinkedIn blocked page {page}: redirected to {self.driver.current_url}")
+            self._record_page(host, 'blocked')
+            return []
         
-        # Junior level positions
-        elif any(junior in title_lower for junior in ['junior', 'jr.', 'entry', 'intern', 'internship']):
-            return 'Entry'
+        # Short delay for initial load
+        self.human_like_delay(2, 3, stage='settle_sleep')
         
-        # Default to Mid if no specific level found
-        else:
-            return 'Mid'
-            
-    def scrape_linkedin_jobs(self, search_term="software engineer", location="", max_pages=1):
-        """Scrape jobs from LinkedIn"""
+        # Wait for job cards to load with a specific limit
+        with self.timer.stage('card_wait'):
+            job_cards = self._find_linkedin_job_cards(limit=limit)
+        if not job_cards:
+            logger.warning(f"No job cards found on page {page}")
+            self._record_page(host, 'empty')
+            return []
+        
+        with self.timer.stage('extract'):
+            jobs = self._extract_linkedin_jobs(job_cards[:limit])
+        self._record_page(host, 'ok')
+        return jobs
+    
+    @staticmethod
+    def rank_jobs(jobs):
+        """Sort jobs by priority, best first"""
+        enrich_jobs([job for job in jobs if 'priority' not in job])
+        return sorted(jobs, 
+            key=lambda x: (
+                x['priority'],
+                x.get('salary', '') != '',  # Prioritize jobs with salary info
+                len(x.get('description', '')) > 100  # Prioritize detailed descriptions
+            ),
+            reverse=True
+        )
+    
+    def scrape_linkedin_jobs(self, search_term="software engineer", location="", max_pages=1, limit=5):
+        """Scrape up to limit jobs per page from the first max_pages pages of LinkedIn"""
         jobs = []
         
         try:
-            # Format the URL with filters for better initial results
-            search_encoded = search_term.replace(' ', '%20')
-            location_encoded = location.replace(' ', '%20') if location else "worldwide"
-            
-            # Add filters to get most relevant results first
-            filters = [
-                'f_TPR=r86400',        # Last 24 hours
-                'f_JT=F',              # Full-time jobs only
-                'f_E=2%2C3%2C4',       # Mid-Senior level (2=Mid, 3=Senior, 4=Executive)
-                'sortBy=R',            # Most relevant first
-                'position=1',          # Start position
-                'pageNum=0',           # First page
-                'f_AL=true'           # Easy apply jobs
-            ]
-            
-            base_url = f"https://www.linkedin.com/jobs/search/?keywords={search_encoded}&location={location_encoded}&{'&'.join(filters)}"
-            
-            logger.info(f"Accessing LinkedIn Jobs: {base_url}")
-            self.driver.get(base_url)
-            
-            # Short delay for initial load
-            self.human_like_delay(2, 3)
-            
-            # Wait for job cards to load with a specific limit
-            job_cards = self._find_linkedin_job_cards(limit=5)
-            if not job_cards:
-                logger.warning("No job cards found")
-                return []
-            
-            # Process only the first 5 job cards
-            jobs.extend(self._extract_linkedin_jobs(job_cards[:5]))
+            for page in range(max_pages):
+                page_jobs = self.scrape_linkedin_page(search_term, location, page, limit)
+                if not page_jobs:
+                    break
+                jobs.extend(page_jobs)
             
             if not jobs:
                 logger.warning("Failed to extract any jobs")
                 return []
             
-            # Sort jobs by priority
-            sorted_jobs = sorted(jobs, 
-                key=lambda x: (
-                    self._get_job_priority_score(x),
-                    x.get('salary', '') != '',  # Prioritize jobs with salary info
-                    len(x.get('description', '')) > 100  # Prioritize detailed descriptions
-                ),
-                reverse=True
-            )[:5]
-            
-            return sorted_jobs
+            return self.rank_jobs(jobs)
             
         except Exception as e:
             logger.error(f"Error scraping LinkedIn: {e}")
-            return []
+            return jobs and self.rank_jobs(jobs)
     
     def close(self):
-        """Clean up resources"""
-        if self.driver:
+        """Clean up resources, leaving leased drivers to their pool"""
+        if self.driver and self._owns_driver:
             try:
                 self.driver.quit()
                 logger.info("Browser driver closed successfully")
@@ -327,7 +466,7 @@ if __name__ == "__main__":
     try:
         # Test with sample data first
         print("Testing with sample data...")
-        jobs = scraper.scrape_jobs("python developer", "california", use_sample=False, max_pages=1)
+        jobs = scraper.scrape_jobs("python developer", "california", max_pages=1)
         
         print(f"\nScraped {len(jobs)} jobs:")
         for i, job in enumerate(jobs[:5], 1):  # Show first 5 jobs
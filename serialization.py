@@ -0,0 +1,88 @@
+import json
+from datetime import date
+from decimal import Decimal
+from flask import current_app
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    """Encode the non-JSON types that appear in job rows"""
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+class StdlibEncoder:
+    """Compact UTF-8 JSON from the standard library encoder"""
+
+    name = 'json'
+
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(',', ':'), ensure_ascii=False, default=_default).encode('utf-8')
+
+
+class OrjsonEncoder:
+    """JSON from orjson, which encodes datetimes natively in ISO 8601"""
+
+    name = 'orjson'
+
+    def dumps(self, obj):
+        return orjson.dumps(obj, default=_default)
+
+
+ENCODERS = {'json': StdlibEncoder()}
+if orjson is not None:
+    ENCODERS['orjson'] = OrjsonEncoder()
+
+
+def get_encoder(name=None):
+    """Look up a JSON encoder by name, defaulting to the JSON_ENCODER setting.
+
+    'auto' picks orjson when it is installed and the standard library
+    encoder otherwise.
+    """
+    name = name or current_app.config.get('JSON_ENCODER', 'auto')
+    if name == 'auto':
+        return ENCODERS.get('orjson', ENCODERS['json'])
+    try:
+        return ENCODERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown or unavailable JSON encoder: {name}")
+
+
+class RowSerializer:
+    """Turns selected-column result tuples into dicts with a precomputed key layout.
+
+    Rows must hold the given fields first and in order, as selected by
+    paginate() or query.with_entities(). Values are left as-is; datetimes
+    are encoded by the JSON encoder.
+    """
+
+    __slots__ = ('fields', '_layout')
+
+    def __init__(self, fields, sort_keys=False):
+        self.fields = tuple(fields)
+        layout = [(field, index) for index, field in enumerate(self.fields)]
+        if sort_keys:
+            layout.sort()
+        self._layout = tuple(layout)
+
+    def __call__(self, row):
+        return {field: row[index] for field, index in self._layout}
+
+    def serialize(self, rows):
+        """Convert every row to a dict"""
+        layout = self._layout
+        return [{field: row[index] for field, index in layout} for row in rows]
+
+
+def json_response(obj, status=200, encoder=None):
+    """Build a JSON response with the configured fast encoder"""
+    encoder = encoder or get_encoder()
+    return current_app.response_class(encoder.dumps(obj), status=status, mimetype='application/json')
@@ -0,0 +1,6 @@
+from blinker import Namespace
+
+_signals = Namespace()
+
+# Sent with the app as sender after a commit that changes the jobs table
+jobs_changed = _signals.signal('jobs-changed')
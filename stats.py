@@ -0,0 +1,206 @@
+import time
+import logging
+import threading
+from database import db
+from models import Job, JobStat
+from signals import jobs_changed
+from table_version import read_version
+
+logger = logging.getLogger(__name__)
+
+# Dimensions counted per value, with the jobs column they group by
+STAT_DIMENSIONS = {
+    'company': 'company',
+    'location': 'location',
+    'job_type': 'job_type',
+    'experience_level': 'experience_level',
+    'scraped': "CASE WHEN {row}.scraped THEN 'true' ELSE 'false' END",
+}
+
+
+def _value(dimension, row):
+    """SQL expression for a dimension's value on the new/old trigger row"""
+    expression = STAT_DIMENSIONS[dimension]
+    if '{row}' in expression:
+        return expression.format(row=row)
+    return f"COALESCE({row}.{expression}, '')"
+
+
+def _increment(row):
+    return '\n'.join(
+        f"""INSERT INTO job_stats(dimension, value, count) VALUES ('{d}', {_value(d, row)}, 1)
+        ON CONFLICT(dimension, value) DO UPDATE SET count = count + 1;"""
+        for d in STAT_DIMENSIONS
+    )
+
+
+def _decrement(row):
+    return '\n'.join(
+        f"""UPDATE job_stats SET count = count - 1 WHERE dimension = '{d}' AND value = {_value(d, row)};
+        DELETE FROM job_stats WHERE dimension = '{d}' AND value = {_value(d, row)} AND count <= 0;"""
+        for d in STAT_DIMENSIONS
+    )
+
+
+_STATS_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS job_stats_ai AFTER INSERT ON jobs BEGIN
+        {_increment('new')}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS job_stats_ad AFTER DELETE ON jobs BEGIN
+        {_decrement('old')}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS job_stats_au
+        AFTER UPDATE OF company, location, job_type, experience_level, scraped ON jobs BEGIN
+        {_decrement('old')}
+        {_increment('new')}
+    END""",
+]
+
+# Engines whose job_stats table is maintained by triggers, keyed by engine URL
+_summary_available = {}
+
+_cache = {}
+_cache_lock = threading.Lock()
+# jobs_version counters the cached statistics were computed at
+_cache_version = None
+
+
+def init_stats(engine):
+    """Create the triggers maintaining job_stats, rebuilding it if they are new"""
+    if engine.dialect.name != 'sqlite':
+        _summary_available[str(engine.url)] = False
+        return False
+
+    with engine.begin() as conn:
+        exists = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type='trigger' AND name='job_stats_ai'"
+        ).first()
+        if not exists:
+            # Recount from scratch in the same transaction the triggers start in
+            conn.exec_driver_sql("DELETE FROM job_stats")
+            for dimension in STAT_DIMENSIONS:
+                value = _value(dimension, 'jobs')
+                conn.exec_driver_sql(
+                    f"INSERT INTO job_stats(dimension, value, count) "
+                    f"SELECT '{dimension}', {value}, COUNT(*) FROM jobs GROUP BY {value}"
+                )
+            logger.info("Built job statistics summary table")
+        for statement in _STATS_TRIGGERS:
+            conn.exec_driver_sql(statement)
+
+    _summary_available[str(engine.url)] = True
+    return True
+
+
+def _summary_enabled(engine):
+    """Check (once per engine) whether job_stats is maintained by triggers"""
+    key = str(engine.url)
+    if key not in _summary_available:
+        if engine.dialect.name != 'sqlite':
+            _summary_available[key] = False
+        else:
+            with engine.connect() as conn:
+                _summary_available[key] = conn.exec_driver_sql(
+                    "SELECT 1 FROM sqlite_master WHERE type='trigger' AND name='job_stats_ai'"
+                ).first() is not None
+    return _summary_available[key]
+
+
+def _top_summary(session, dimension, top):
+    rows = session.query(JobStat.value, JobStat.count).filter(
+        JobStat.dimension == dimension
+    ).order_by(JobStat.count.desc()).limit(top).all()
+    # Missing values are stored as '' so they can be counted under one key
+    return [{'name': value or None, 'count': count} for value, count in rows]
+
+
+def _top_live(session, column, top):
+    rows = session.query(
+        column,
+        db.func.count(Job.id).label('count')
+    ).group_by(column).order_by(
+        db.func.count(Job.id).desc()
+    ).limit(top).all()
+    return [{'name': value, 'count': count} for value, count in rows]
+
+
+def compute_stats(top=5, session=None, summary=None):
+    """Compute job statistics from the summary table, or live if unavailable.
+
+    Queries run on session, the app's session by default. summary says
+    whether job_stats is maintained, checked on the app's engine if None.
+    """
+    session = session or db.session
+    if summary is None:
+        summary = _summary_enabled(db.engine)
+    if summary:
+        scraped_counts = dict(session.query(JobStat.value, JobStat.count).filter(
+            JobStat.dimension == 'scraped'
+        ).all())
+        scraped_jobs = scraped_counts.get('true', 0)
+        total_jobs = scraped_jobs + scraped_counts.get('false', 0)
+        top_of = _top_summary
+        columns = {d: d for d in ('company', 'location', 'job_type', 'experience_level')}
+    else:
+        total_jobs = session.query(Job).count()
+        scraped_jobs = session.query(Job).filter_by(scraped=True).count()
+        top_of = _top_live
+        columns = {d: getattr(Job, d) for d in ('company', 'location', 'job_type', 'experience_level')}
+
+    return {
+        'total_jobs': total_jobs,
+        'scraped_jobs': scraped_jobs,
+        'manual_jobs': total_jobs - scraped_jobs,
+        'top_companies': top_of(session, columns['company'], top),
+        'top_locations': top_of(session, columns['location'], top),
+        'top_job_types': top_of(session, columns['job_type'], top),
+        'top_experience_levels': top_of(session, columns['experience_level'], top)
+    }
+
+
+def cached_stats(key):
+    """Statistics cached under key, or None if missing or expired"""
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    return None
+
+
+def cache_stats(key, stats, ttl):
+    """Cache statistics under key for ttl seconds"""
+    if ttl > 0:
+        with _cache_lock:
+            _cache[key] = (time.monotonic() + ttl, stats)
+
+
+def sync_stats_version(version):
+    """Drop cached statistics if the shared jobs_version counters changed since the last call"""
+    global _cache_version
+    if version is None or version == _cache_version:
+        return
+    with _cache_lock:
+        _cache_version = version
+        _cache.clear()
+
+
+def get_stats(top=5, ttl=5.0):
+    """Read-through cache in front of compute_stats"""
+    sync_stats_version(read_version())
+    key = (str(db.engine.url), top)
+    stats = cached_stats(key)
+    if stats is None:
+        stats = compute_stats(top)
+        cache_stats(key, stats, ttl)
+    return stats
+
+
+def invalidate_stats_cache():
+    """Drop cached statistics so the next read recomputes them"""
+    with _cache_lock:
+        _cache.clear()
+
+
+@jobs_changed.connect
+def _on_jobs_changed(sender, **extra):
+    invalidate_stats_cache()
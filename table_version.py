@@ -0,0 +1,71 @@
+import logging
+from database import db
+from models import JobsVersion
+
+logger = logging.getLogger(__name__)
+
+# The single row of jobs_version
+VERSION_ID = 1
+
+_VERSION_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS jobs_version_ai AFTER INSERT ON jobs BEGIN
+        UPDATE jobs_version SET version = version + 1 WHERE id = 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS jobs_version_au AFTER UPDATE ON jobs BEGIN
+        UPDATE jobs_version SET version = version + 1 WHERE id = 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS jobs_version_ad AFTER DELETE ON jobs BEGIN
+        UPDATE jobs_version SET version = version + 1, deletes = deletes + 1 WHERE id = 1;
+    END""",
+]
+
+# Engines whose jobs_version row is maintained by triggers, keyed by engine URL
+_version_available = {}
+
+
+def init_table_version(engine):
+    """Create the jobs_version row and the triggers counting changes to jobs.
+
+    The counters let every process sharing the database notice writes made
+    by others, e.g. a CLI command or another server worker, with a single
+    primary key lookup.
+    """
+    if engine.dialect.name != 'sqlite':
+        _version_available[str(engine.url)] = False
+        return False
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            f"INSERT OR IGNORE INTO jobs_version(id, version, deletes) VALUES ({VERSION_ID}, 0, 0)")
+        for statement in _VERSION_TRIGGERS:
+            conn.exec_driver_sql(statement)
+
+    _version_available[str(engine.url)] = True
+    return True
+
+
+def version_enabled(engine):
+    """Check (once per engine) whether jobs_version is maintained by triggers"""
+    key = str(engine.url)
+    if key not in _version_available:
+        if engine.dialect.name != 'sqlite':
+            _version_available[key] = False
+        else:
+            with engine.connect() as conn:
+                _version_available[key] = conn.exec_driver_sql(
+                    "SELECT 1 FROM sqlite_master WHERE type='trigger' AND name='jobs_version_ai'"
+                ).first() is not None
+    return _version_available[key]
+
+
+def version_statement():
+    """SELECT of the (version, deletes) counters"""
+    return db.select(JobsVersion.version, JobsVersion.deletes).where(JobsVersion.id == VERSION_ID)
+
+
+def read_version(session=None):
+    """The (version, deletes) counters of the jobs table, or None where they are not maintained"""
+    if not version_enabled(db.engine):
+        return None
+    row = (session or db.session).execute(version_statement()).first()
+    return tuple(row) if row is not None else None